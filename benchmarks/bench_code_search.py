@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+比較 code_search.py 的 trigram 索引查詢與 grep -r 全掃描
+量測索引建立 (冷/熱) 時間，以及每個查詢的延遲與結果數
+"""
+import os
+import sys
+import time
+import json
+import subprocess
+from typing import List, Dict
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import code_search
+
+DEFAULT_QUERIES = [
+    'ui_finish_populating_widget_popup',
+    r'def\s+PLUGIN_ENTRY',
+    r'FindImmediate|find_imm',
+    r'register_action\s*\(',
+    r'0x[0-9a-f]{8}',
+]
+
+def grep_command(pattern: str, ignore_case: bool) -> List[str]:
+    """與索引相同範圍 (原始碼副檔名、略過 .git 等) 的 grep 命令"""
+    cmd = ['grep', '-rnIE']
+    if ignore_case:
+        cmd.append('-i')
+    cmd += [f'--exclude-dir={d}' for d in sorted(code_search.SKIP_DIRS)]
+    cmd += [f'--include=*{ext}' for ext in sorted(code_search.SOURCE_EXTENSIONS)]
+    return cmd + ['-e', pattern, '.']
+
+def timed(func, repeat: int) -> (float, object):
+    """執行 repeat 次，返回最短時間 (ms) 與最後一次結果"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best, result
+
+def main():
+    """主函數"""
+    if '-h' in sys.argv or '--help' in sys.argv:
+        print("用法: python3 benchmarks/bench_code_search.py [--queries 'a;b'] [-i] [--repeat N] [--rebuild] [--output FILE]")
+        sys.exit(0)
+
+    def option(name: str, default=None):
+        if name in sys.argv:
+            return sys.argv[sys.argv.index(name) + 1]
+        return default
+
+    queries = option('--queries')
+    queries = queries.split(';') if queries else DEFAULT_QUERIES
+    repeat = int(option('--repeat', '3'))
+    ignore_case = '-i' in sys.argv
+    output = option('--output')
+    report = {'index': {}, 'queries': []}
+
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            start = time.perf_counter()
+            stats = code_search.build_index(rebuild='--rebuild' in sys.argv)
+            report['index']['build_ms'] = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            code_search.build_index()
+            report['index']['noop_ms'] = (time.perf_counter() - start) * 1000
+        finally:
+            sys.stdout = stdout
+
+    size = sum(os.path.getsize(os.path.join(code_search.INDEX_DIR, f)) for f in os.listdir(code_search.INDEX_DIR))
+    report['index'].update(stats, bytes=size)
+    print(f"🗂️  索引: 重建 {stats['rebuilt']} 段 {report['index']['build_ms']:.0f} ms，"
+          f"無變更時 {report['index']['noop_ms']:.0f} ms，{size / 1024:.0f} KiB")
+
+    width = max(len(q) for q in queries + ['Query'])
+    print()
+    print(f"{'Query':<{width}}  {'Index ms':>9}  {'grep ms':>9}  {'Speedup':>8}  {'Cand.':>6}  {'Lines':>6}  {'grep':>6}")
+    print('-' * (width + 58))
+    for query in queries:
+        index_ms, (matches, stats) = timed(lambda: code_search.search(query, ignore_case), repeat)
+        grep_ms, grep_result = timed(lambda: subprocess.run(grep_command(query, ignore_case), cwd=REPO_DIR,
+                                                            capture_output=True, text=True, errors='replace'), repeat)
+        grep_lines = len(grep_result.stdout.splitlines())
+        speedup = grep_ms / index_ms if index_ms else 0
+        print(f"{query:<{width}}  {index_ms:>9.1f}  {grep_ms:>9.1f}  {speedup:>7.1f}x  "
+              f"{stats['candidates']:>6}  {len(matches):>6}  {grep_lines:>6}")
+        report['queries'].append({'query': query, 'index_ms': index_ms, 'grep_ms': grep_ms,
+                                  'candidates': stats['candidates'], 'files': stats['files'],
+                                  'matches': len(matches), 'grep_matches': grep_lines})
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+比較一般部署與 --lazy 代理部署的 IDA 啟動成本
+分別部署到兩個暫存 IDAUSR，再以 profile_plugins.py 的替身 IDA 模組量測每個入口的載入時間
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+from typing import List, Dict
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from profile_plugins import deployed_entries, profile_targets
+from deploy_plugins import is_generated, PROXY_MARKER
+
+def deploy(idausr: str, lazy: bool, plugins: str = None) -> None:
+    """以 deploy_plugins.py 部署 (不安裝依賴)"""
+    cmd = [sys.executable, os.path.join(REPO_DIR, 'deploy_plugins.py'), idausr, '--no-deps']
+    if lazy:
+        cmd.append('--lazy')
+    if plugins:
+        cmd += ['--plugins', plugins]
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+
+def measure(idausr: str, python: str, repeat: int) -> Dict[str, Dict]:
+    """量測已部署目錄中每個入口的載入時間"""
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            results = profile_targets(deployed_entries(os.path.join(idausr, 'plugins')), python, repeat=repeat)
+        finally:
+            sys.stdout = stdout
+    return {r['name']: r for r in results}
+
+def main():
+    """主函數"""
+    if '-h' in sys.argv or '--help' in sys.argv:
+        print("用法: python3 benchmarks/bench_lazy_plugins.py [--plugins a,b] [--repeat N] [--python PATH] [--output FILE]")
+        sys.exit(0)
+
+    def option(name: str, default=None):
+        if name in sys.argv:
+            return sys.argv[sys.argv.index(name) + 1]
+        return default
+
+    plugins = option('--plugins')
+    repeat = int(option('--repeat', '3'))
+    python = option('--python', sys.executable)
+    output = option('--output')
+
+    workdir = tempfile.mkdtemp(prefix='bench_lazy_')
+    try:
+        report = {}
+        for mode in ('eager', 'lazy'):
+            idausr = os.path.join(workdir, mode)
+            deploy(idausr, mode == 'lazy', plugins)
+            print(f"🔬 量測 {mode} 部署...")
+            report[mode] = measure(idausr, python, repeat)
+            # 只有代理檔會延遲到第一次 run()；連結的入口 (包含 init() 需註冊的 plugin) 仍在啟動時載入
+            for result in report[mode].values():
+                result['proxied'] = is_generated(result['file'], (PROXY_MARKER,))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    names = sorted(set(report['eager']) | set(report['lazy']),
+                   key=lambda n: report['eager'].get(n, {}).get('total', 0), reverse=True)
+    width = max([len(n) for n in names] + [len('Plugin')])
+    print()
+    print(f"{'Plugin':<{width}}  {'Eager ms':>9}  {'Lazy ms':>9}  {'Saved ms':>9}  Lazy mode")
+    print('-' * (width + 46))
+
+    totals = {'eager': 0.0, 'lazy': 0.0}
+    for name in names:
+        eager = report['eager'].get(name, {}).get('total', 0.0)
+        lazy = report['lazy'].get(name, {}).get('total', 0.0)
+        totals['eager'] += eager
+        totals['lazy'] += lazy
+        mode = 'proxy' if report['lazy'].get(name, {}).get('proxied') else 'startup'
+        print(f"{name:<{width}}  {eager * 1000:>9.1f}  {lazy * 1000:>9.1f}  {(eager - lazy) * 1000:>9.1f}  {mode}")
+
+    saved = totals['eager'] - totals['lazy']
+    ratio = saved / totals['eager'] * 100 if totals['eager'] else 0
+    print('-' * (width + 46))
+    print(f"{'合計':<{width - 2}}  {totals['eager'] * 1000:>9.1f}  {totals['lazy'] * 1000:>9.1f}  {saved * 1000:>9.1f}")
+    proxied = sum(1 for r in report['lazy'].values() if r['proxied'])
+    print(f"\n💤 {proxied} / {len(report['lazy'])} 個入口以代理延遲，其餘仍在啟動時載入並計入 Lazy ms")
+    print(f"⚡ 啟動時間減少 {ratio:.0f}% (延遲的成本會在第一次執行該 plugin 時才發生)")
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump({'totals': totals, 'plugins': report}, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
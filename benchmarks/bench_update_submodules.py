@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+update_submodules.py 的離線效能測試
+對 N 個本地 submodule 量測: 狀態收集、更新計畫、逐一 vs 並行更新、注入失敗後的重試，以及記憶體用量
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import resource
+import tempfile
+import tracemalloc
+import contextlib
+from typing import List, Dict, Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import update_submodules
+from submodule_fixture import GIT_ENV, create_remotes, create_superproject
+
+@contextlib.contextmanager
+def working_directory(path: str):
+    """暫時切換工作目錄 (update_submodules.py 以目前目錄為 superproject)"""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+def measure(name: str, func: Callable, cwd: str) -> Dict:
+    """執行一個階段並記錄耗時、Python 記憶體峰值，以及本行程與子行程 RSS 峰值在這個階段的增長
+    ru_maxrss 是整個行程生命期的峰值，只有前後的差值才屬於這個階段 (0 代表沒有超過先前的峰值)
+    """
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    with working_directory(cwd), open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        result = func()
+    duration = time.perf_counter() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'phase': name,
+        'duration': duration,
+        'py_peak_kb': peak // 1024,
+        'rss_growth_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before,
+        'children_rss_growth_kb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss - children_before,
+        'result': result
+    }
+
+def inject_failures(paths: List[str]) -> Callable:
+    """包裝 run_command: 指定 submodule 的第一次 update 失敗，之後恢復正常"""
+    original = update_submodules.run_command
+    pending = set(paths)
+
+    def run_command(cmd, cwd=None, timeout=300):
+        text = cmd if isinstance(cmd, str) else ' '.join(cmd)
+        if text.startswith('git submodule update'):
+            path = text.split()[-1]
+            if path in pending:
+                pending.discard(path)
+                return {'success': False, 'returncode': 1, 'stdout': '',
+                        'stderr': 'injected failure', 'command': text}
+        return original(cmd, cwd, timeout)
+
+    update_submodules.run_command = run_command
+    return original
+
+def summarize(results: List[Dict]) -> Dict:
+    """只保留更新結果的統計，避免報告過大"""
+    return {
+        'success': sum(1 for r in results if r['success']),
+        'failed': sum(1 for r in results if not r['success'])
+    }
+
+def bench_size(root: str, count: int, depth: int, blob_size: int, jobs: int, fail_rate: float) -> List[Dict]:
+    """對單一 submodule 數量執行全部階段"""
+    phases = []
+
+    start_time = time.perf_counter()
+    remotes = create_remotes(root, count, depth, blob_size)
+    phases.append({'phase': 'fixture', 'duration': time.perf_counter() - start_time, 'result': {'count': count}})
+
+    status_super = create_superproject(os.path.join(root, 'super_status'), remotes)
+    phase = measure('status', update_submodules.get_submodule_status, status_super)
+    phase['result'] = {'count': len(phase['result'])}
+    phases.append(phase)
+
+    def plan():
+        return update_submodules.plan_submodules(update_submodules.parse_gitmodules(), jobs)
+
+    phase = measure('plan', plan, status_super)
+    phase['result'] = {'count': len(phase['result'])}
+    phases.append(phase)
+
+    for name, update_jobs in [('update_sequential', 1), ('update_parallel', jobs)]:
+        superproject = create_superproject(os.path.join(root, f'super_{name}'), remotes)
+
+        def update(update_jobs=update_jobs):
+            submodules = update_submodules.get_submodule_status()
+            return summarize(update_submodules.update_all_submodules(
+                submodules, jobs=update_jobs, delay=0))
+
+        phases.append(measure(name, update, superproject))
+
+    retry_super = create_superproject(os.path.join(root, 'super_retry'), remotes)
+    rng = random.Random(count)
+    failing = [r['path'] for r in remotes if rng.random() < fail_rate]
+
+    def update_with_retry():
+        submodules = update_submodules.get_submodule_status()
+        original = inject_failures(failing)
+        try:
+            results = update_submodules.update_all_submodules(submodules, retry_count=2, jobs=jobs, delay=0)
+        finally:
+            update_submodules.run_command = original
+        return dict(summarize(results), injected=len(failing))
+
+    phases.append(measure('update_retry', update_with_retry, retry_super))
+    return phases
+
+def main():
+    """主函數"""
+    if '-h' in sys.argv or '--help' in sys.argv:
+        print("用法: python3 benchmarks/bench_update_submodules.py [選項]")
+        print("")
+        print("選項:")
+        print("  --sizes A,B,C     submodule 數量 (預設 80,500,2000)")
+        print("  --depth N         每個 repo 的 commit 數 (預設 20)")
+        print("  --blob-size N     每個 commit 的 blob 大小 bytes (預設 4096)")
+        print("  --jobs N          並行更新數 (預設 8)")
+        print("  --fail-rate F     注入失敗的比例 (預設 0.1)")
+        print("  --workdir DIR     測試目錄 (預設為暫存目錄，結束後刪除)")
+        print("  --output FILE     將結果寫入 JSON 檔")
+        sys.exit(0)
+
+    def option(name: str, default, convert=str):
+        if name in sys.argv:
+            return convert(sys.argv[sys.argv.index(name) + 1])
+        return default
+
+    sizes = [int(n) for n in option('--sizes', '80,500,2000').split(',')]
+    depth = option('--depth', 20, int)
+    blob_size = option('--blob-size', 4096, int)
+    jobs = option('--jobs', 8, int)
+    fail_rate = option('--fail-rate', 0.1, float)
+    workdir = option('--workdir', None)
+    output = option('--output', None)
+
+    # 子行程 (git clone) 需要允許本地 file 協定
+    os.environ.update(GIT_ENV)
+
+    report = []
+    for count in sizes:
+        root = tempfile.mkdtemp(prefix=f'bench_submodules_{count}_', dir=workdir)
+        print(f"📏 N = {count}")
+        try:
+            phases = bench_size(root, count, depth, blob_size, jobs, fail_rate)
+        finally:
+            if workdir is None:
+                shutil.rmtree(root, ignore_errors=True)
+
+        for phase in phases:
+            memory = (f"py {phase['py_peak_kb']:>8} KB  +rss {phase['rss_growth_kb']:>8} KB  "
+                      f"+git rss {phase['children_rss_growth_kb']:>8} KB") if 'py_peak_kb' in phase else ''
+            print(f"  {phase['phase']:<18} {phase['duration']:>9.2f}s  {memory}  {phase['result']}")
+        report.append({'count': count, 'depth': depth, 'blob_size': blob_size, 'jobs': jobs, 'phases': phases})
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📄 結果已保存到: {output}")
+
+if __name__ == "__main__":
+    main()
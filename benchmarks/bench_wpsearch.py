@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+在沒有 IDA 的環境量測 scripts/wpsearch.py
+以 benchmarks/ida_mock 的替身 idc/idaapi/idautils 與合成資料庫 (含植入的 checksum 函數)，
+量測 checksums()、xrefs() 與 chooser 填入在不同函數數量下的耗時與記憶體用量，
+並以植入 CRC32/MD5 常數的誘餌函數檢查誤判
+"""
+import os
+import sys
+import json
+import time
+import resource
+import threading
+import subprocess
+import tracemalloc
+from typing import Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.realpath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, 'ida_mock'))
+sys.path.insert(0, os.path.join(REPO_DIR, 'scripts'))
+
+def measure(name: str, func: Callable, trace_memory: bool = False) -> Dict:
+    """執行一個階段並記錄耗時、RSS 峰值在這個階段的增長與 (選擇性) Python 記憶體峰值
+    ru_maxrss 是整個行程的峰值，只有前後的差值才屬於這個階段
+    """
+    if trace_memory:
+        tracemalloc.start()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start_time = time.perf_counter()
+    result = func()
+    duration = time.perf_counter() - start_time
+
+    entry = {
+        'phase': name,
+        'duration': duration,
+        'rss_growth_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before,
+        'result': result,
+    }
+    if trace_memory:
+        entry['py_peak_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+    return entry
+
+def run_size(functions: int, instructions: int, callers: int, planted: int, partial: int, decoys: int,
+             trace_memory: bool) -> Dict:
+    """在目前的行程中量測一個資料庫大小，返回每個階段的結果與行程的 RSS 峰值"""
+    import synthetic_db
+    db = synthetic_db.configure(functions=functions, instructions=instructions, callers=callers,
+                                planted=planted, partial=partial, decoys=decoys)
+    import wpsearch
+
+    expected = set(db.function_start(i) for i in db.planted)
+
+    def checksums():
+        found = wpsearch.WPSearch().checksums()
+        return {'found': len(found), 'planted': len(expected), 'missed': len(expected - found),
+                'false_positives': len(found - expected)}
+
+    def rescan_patched():
+        for i in range(0, functions, 100):
+            db.patch(db.function_start(i))
+        return checksums()
+
+    def reopen():
+        # 關閉後重新開啟: closebase 丟棄記憶體中的索引與 hooks，只剩 netnode
+        db.close()
+        return checksums()
+
+    search = wpsearch.WPSearch()
+
+    def xrefs(depth: int) -> Callable:
+        return lambda: {'functions': len(search.xrefs(depth=depth)), 'depth': depth}
+
+    def chooser():
+        view = wpsearch.WPSearchFunctionChooser()
+        view.running = True
+        view.scan(threading.Event())
+        rows = [view.OnGetLine(n) for n in range(view.OnGetSize())]
+        return {'rows': len(rows)}
+
+    phases = [
+        ('checksums_cold', checksums),
+        ('checksums_warm', checksums),
+        ('rescan_1pct_patched', rescan_patched),
+        ('reopen_idb', reopen),
+        ('xrefs_depth_1', xrefs(1)),
+        ('xrefs_depth_3', xrefs(3)),
+        ('xrefs_depth_2_memo', xrefs(2)),
+        ('chooser_populate', chooser),
+    ]
+
+    results = [measure(name, func, trace_memory) for name, func in phases]
+    return {'phases': results, 'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+def main():
+    """主函數"""
+    if '-h' in sys.argv or '--help' in sys.argv:
+        print("用法: python3 benchmarks/bench_wpsearch.py [選項]")
+        print("")
+        print("選項:")
+        print("  --sizes A,B,C       函數數量 (預設 10000,100000,1000000)")
+        print("  --instructions N    每個函數的指令數 (預設 8)")
+        print("  --callers N         每個函數的呼叫者數 (預設 2)")
+        print("  --planted N         植入的完整 checksum 函數數 (預設 8)")
+        print("  --partial N         植入只含 5/7 常數的函數數 (預設 4)")
+        print("  --decoys N          植入 CRC32/MD5 常數 (及 3/7 個 WPS 常數) 的誘餌函數數 (預設 8)")
+        print("  --trace-memory      另外以 tracemalloc 記錄 Python 記憶體峰值 (較慢)")
+        print("  --output FILE       將結果寫入 JSON 檔")
+        sys.exit(0)
+
+    def option(name: str, default, convert=str):
+        if name in sys.argv:
+            return convert(sys.argv[sys.argv.index(name) + 1])
+        return default
+
+    instructions = option('--instructions', 8, int)
+    callers = option('--callers', 2, int)
+    planted = option('--planted', 8, int)
+    partial = option('--partial', 4, int)
+    decoys = option('--decoys', 8, int)
+    trace_memory = '--trace-memory' in sys.argv
+
+    # 每個大小在獨立的子行程中執行，RSS 峰值才不會互相影響
+    single = option('--single', None, int)
+    if single:
+        results = run_size(single, instructions, callers, planted, partial, decoys, trace_memory)
+        print(json.dumps(results))
+        return
+
+    sizes = [int(n) for n in option('--sizes', '10000,100000,1000000').split(',')]
+    output = option('--output', None)
+    report = {}
+    for size in sizes:
+        print(f"🔬 {size:,} 個函數...")
+        cmd = [sys.executable, os.path.realpath(__file__), '--single', str(size),
+               '--instructions', str(instructions), '--callers', str(callers),
+               '--planted', str(planted), '--partial', str(partial), '--decoys', str(decoys)]
+        if trace_memory:
+            cmd.append('--trace-memory')
+        completed = subprocess.run(cmd, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(completed.stderr)
+            sys.exit(1)
+        report[size] = json.loads(completed.stdout.splitlines()[-1])
+
+    print()
+    header = f"{'Functions':>10}  {'Phase':<22}  {'Seconds':>8}  {'+RSS MB':>7}"
+    if trace_memory:
+        header += f"  {'Py peak MB':>10}"
+    print(header + "  Result")
+    print('-' * (len(header) + 30))
+    for size, results in report.items():
+        for entry in results['phases']:
+            line = f"{size:>10,}  {entry['phase']:<22}  {entry['duration']:>8.3f}  {entry['rss_growth_kb'] / 1024:>7.1f}"
+            if trace_memory:
+                line += f"  {entry['py_peak_kb'] / 1024:>10.1f}"
+            print(line + "  " + ', '.join(f"{k}={v}" for k, v in entry['result'].items()))
+        print(f"{size:>10,}  {'(RSS 峰值)':<20}  {'':>8}  {results['peak_rss_kb'] / 1024:>7.1f}")
+
+    missed = [(size, e['phase']) for size, results in report.items() for e in results['phases']
+              if e['result'].get('missed')]
+    if missed:
+        print(f"\n❌ 有植入的 checksum 函數未被找到: {missed}")
+    false_positives = [(size, e['phase']) for size, results in report.items() for e in results['phases']
+                       if e['result'].get('false_positives')]
+    if false_positives:
+        print(f"\n❌ 誘餌函數被誤判為 WPS checksum: {false_positives}")
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n📄 結果已保存到: {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+替身 idaapi 模組: get_func、netnode、IDB_Hooks、IDP_Hooks、Choose2 與 execute_sync (直接在呼叫端執行)
+"""
+import synthetic_db
+from synthetic_db import BADADDR, BADNODE, UA_MAXOP
+
+MFF_FAST = 0
+MFF_READ = 1
+MFF_WRITE = 2
+
+class func_t(object):
+    def __init__(self, start, end):
+        self.startEA = start
+        self.endEA = end
+
+def get_func(ea):
+    db = synthetic_db.DB
+    index = db.function_index(ea)
+    if index is None:
+        return None
+    start = db.function_start(index)
+    return func_t(start, start + db.function_size)
+
+def netnode(name, namelen=0, do_create=False):
+    return synthetic_db.Netnode(synthetic_db.DB, name)
+
+def execute_sync(callable, reqf):
+    return callable()
+
+MESSAGES = []
+
+def msg(text):
+    MESSAGES.append(text)
+
+class IDB_Hooks(object):
+    def hook(self):
+        synthetic_db.DB.hooks.append(self)
+        return True
+
+    def unhook(self):
+        if self in synthetic_db.DB.hooks:
+            synthetic_db.DB.hooks.remove(self)
+        return True
+
+class IDP_Hooks(object):
+    def hook(self):
+        synthetic_db.DB.idp_hooks.append(self)
+        return True
+
+    def unhook(self):
+        if self in synthetic_db.DB.idp_hooks:
+            synthetic_db.DB.idp_hooks.remove(self)
+        return True
+
+class Choose2(object):
+    CHCOL_PLAIN = 0x00000000
+    CHCOL_HEX = 0x00010000
+    CHCOL_DEC = 0x00030000
+
+    def __init__(self, title, cols, flags=0, popup_names=None, icon=-1, x1=-1, y1=-1, x2=-1, y2=-1,
+                 deflt=-1, embedded=False, width=None, height=None):
+        self.title = title
+        self.cols = cols
+        self.commands = []
+
+    def Show(self, modal=False):
+        return 0
+
+    def Refresh(self):
+        pass
+
+    def Close(self):
+        self.OnClose()
+
+    def AddCommand(self, caption, flags=0, menu_index=-1, icon=-1, emb=None):
+        self.commands.append(caption)
+        return len(self.commands) - 1
@@ -0,0 +1,55 @@
+"""
+替身 idautils 模組: 函數、指令、xref 與字串的迭代器
+"""
+import synthetic_db
+
+class XrefTo(object):
+    def __init__(self, frm, to, type):
+        self.frm = frm
+        self.to = to
+        self.type = type
+
+def Functions(start=None, end=None):
+    db = synthetic_db.DB
+    for index in range(db.functions):
+        ea = db.function_start(index)
+        if (start is None or ea >= start) and (end is None or ea < end):
+            yield ea
+
+def FuncItems(start):
+    db = synthetic_db.DB
+    index = db.function_index(start)
+    if index is None:
+        return iter(())
+    return iter(range(db.function_start(index), db.function_start(index) + db.function_size, 4))
+
+def Chunks(start):
+    db = synthetic_db.DB
+    index = db.function_index(start)
+    if index is not None:
+        yield (db.function_start(index), db.function_start(index) + db.function_size)
+
+def XrefsTo(ea, flags=0):
+    """函數入口的呼叫者 (call 位於呼叫者的第 2 個指令)"""
+    db = synthetic_db.DB
+    index = db.function_index(ea)
+    if index is None or ea != db.function_start(index):
+        return iter(())
+    return iter([XrefTo(db.function_start(caller) + 4, ea, 17) for caller in db.callers_of(index)])
+
+def DataRefsFrom(ea):
+    return iter(synthetic_db.DB.data_refs_from(ea))
+
+class StringItem(object):
+    def __init__(self, ea, value):
+        self.ea = ea
+        self.length = len(value)
+        self.value = value
+
+    def __str__(self):
+        return self.value
+
+def Strings(default_setup=True):
+    db = synthetic_db.DB
+    for index in range(db.strings):
+        yield StringItem(db.string_ea(index), db.string_value(index))
@@ -0,0 +1,58 @@
+"""
+替身 idc 模組 (IDA 6.x API 的子集)，資料來自 synthetic_db
+"""
+import synthetic_db
+from synthetic_db import BADADDR, O_VOID as o_void, O_REG as o_reg, O_IMM as o_imm
+
+SEARCH_DOWN = 1
+ASCSTR_C = 0
+
+def GetOpType(ea, n):
+    return synthetic_db.DB.operand(ea, n)[0]
+
+def GetOperandValue(ea, n):
+    op_type, value = synthetic_db.DB.operand(ea, n)
+    return value if op_type == o_imm else -1
+
+def GetFlags(ea):
+    db = synthetic_db.DB
+    if db.function_index(ea) is not None:
+        return synthetic_db.FF_CODE
+    index = db.string_index(ea)
+    if index is not None and ea == db.string_ea(index):
+        return synthetic_db.FF_ASCI | synthetic_db.FF_DATA
+    return synthetic_db.FF_UNK
+
+def isASCII(flags):
+    return flags & 0xF0000000 == synthetic_db.FF_ASCI
+
+def isUnknown(flags):
+    return flags & synthetic_db.FF_CODE == 0
+
+def GetStringType(ea):
+    return ASCSTR_C
+
+def GetString(ea, length=-1, strtype=ASCSTR_C):
+    index = synthetic_db.DB.string_index(ea)
+    return None if index is None else synthetic_db.DB.string_value(index)
+
+def GetManyBytes(ea, size, use_dbg=False):
+    db = synthetic_db.DB
+    index = db.function_index(ea)
+    if index is None:
+        return None
+    offset = ea - db.function_start(index)
+    return db.function_bytes(index)[offset:offset + size]
+
+def GetIdbPath():
+    return '/synthetic/%d.idb' % synthetic_db.DB.functions
+
+def Name(ea):
+    index = synthetic_db.DB.function_index(ea)
+    return 'sub_%X' % ea if index is not None else ''
+
+def Jump(ea):
+    return True
+
+def AskLong(default, prompt):
+    return default
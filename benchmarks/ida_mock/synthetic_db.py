@@ -0,0 +1,199 @@
+"""
+替身 IDA 模組 (idc / idaapi / idautils) 共用的合成資料庫
+所有內容 (指令、運算元、字串、呼叫關係) 都由位址以雜湊即時推導，不預先產生，
+因此 100 萬個函數也只佔用常數記憶體；只有 netnode 與被 patch 的函數會被記錄
+"""
+import bisect
+import struct
+from typing import Dict, List, Optional, Tuple
+
+# 與 wpsearch.py 的 WPSearch.IMMEDIATES 相同
+WPS_CONSTANTS = (0x6B5FCA6B, 0x431BDE83, 0x0A7C5AC5, 0x10624DD3, 0x51EB851F, 0xCCCCCCCD, 0xD1B71759)
+# 誘餌函數: CRC32 多項式與 MD5 IV，再加上低於 70% 門檻的 3/7 個 WPS 常數 (不應被當成 WPS checksum)
+DECOY_CONSTANTS = (0xEDB88320, 0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476) + WPS_CONSTANTS[:3]
+
+CODE_BASE = 0x00400000
+STRING_BASE = 0x10000000
+STRING_SIZE = 32
+UA_MAXOP = 6
+
+O_VOID = 0
+O_REG = 1
+O_IMM = 5
+
+FF_CODE = 0x00000600
+FF_DATA = 0x00000400
+FF_ASCI = 0x50000000
+FF_UNK = 0x00000000
+
+def mix(value: int) -> int:
+    """32-bit 整數雜湊 (決定性，用來推導所有合成內容)"""
+    value = (value ^ (value >> 16)) * 0x45D9F3B & 0xFFFFFFFF
+    value = (value ^ (value >> 16)) * 0x45D9F3B & 0xFFFFFFFF
+    return value ^ (value >> 16)
+
+class SyntheticDB(object):
+    """合成資料庫: 函數 i 位於 CODE_BASE + i * 4 * instructions，每個指令 4 bytes"""
+
+    def __init__(self, functions: int = 10000, instructions: int = 8, strings: int = 0,
+                 callers: int = 2, string_refs: float = 0.25, planted: int = 0, partial: int = 0,
+                 decoys: int = 0):
+        self.functions = functions
+        self.instructions = instructions
+        self.strings = strings or max(1, functions // 4)
+        self.callers = callers
+        self.string_refs = string_refs
+        self.function_size = instructions * 4
+        self.code_end = CODE_BASE + functions * self.function_size
+
+        # 植入的 checksum 函數: planted 個含全部常數，partial 個只含 5/7 (仍達 70% 門檻)
+        self.planted = {}
+        step = max(1, functions // max(1, planted + partial))
+        for n in range(planted + partial):
+            index = (n * step + step // 2) % functions
+            count = len(WPS_CONSTANTS) if n < planted else 5
+            self.planted[index] = WPS_CONSTANTS[:count]
+
+        # 誘餌函數放在植入函數之間 (不與其重疊)
+        self.decoys = {}
+        step = max(1, functions // max(1, decoys))
+        for n in range(decoys):
+            index = (n * step + step // 4) % functions
+            while index in self.planted or index in self.decoys:
+                index = (index + 1) % functions
+            self.decoys[index] = DECOY_CONSTANTS
+
+        longest = max([len(c) for c in list(self.planted.values()) + list(self.decoys.values())] + [0])
+        if longest > instructions:
+            raise ValueError('instructions per function must be at least %d' % longest)
+
+        self.versions = {}
+        self.netnodes = {}
+        self.hooks = []
+        self.idp_hooks = []
+
+    # 函數與指令
+
+    def function_index(self, ea: int) -> Optional[int]:
+        if CODE_BASE <= ea < self.code_end:
+            return (ea - CODE_BASE) // self.function_size
+        return None
+
+    def function_start(self, index: int) -> int:
+        return CODE_BASE + index * self.function_size
+
+    def operand(self, ea: int, n: int) -> Tuple[int, int]:
+        """返回 (運算元型態, 值)；第 0 個運算元是暫存器，第 1 個是立即值或暫存器"""
+        index = self.function_index(ea)
+        if index is None or ea % 4 or n >= 2:
+            return O_VOID, 0
+        if n == 0:
+            return O_REG, mix(ea) & 0x1F
+
+        slot = (ea - self.function_start(index)) // 4
+        planted = self.planted.get(index) or self.decoys.get(index)
+        if planted and slot < len(planted):
+            return O_IMM, planted[slot]
+
+        h = mix(ea ^ 0x9E3779B9 ^ self.versions.get(index, 0))
+        if h & 3 == 0:
+            return O_IMM, h >> 20
+        return O_REG, h & 0x1F
+
+    def function_bytes(self, index: int) -> bytes:
+        version = self.versions.get(index, 0)
+        start = self.function_start(index)
+        return struct.pack('<%dI' % self.instructions,
+                           *[mix(start + i * 4 + version) for i in range(self.instructions)])
+
+    def callers_of(self, index: int) -> List[int]:
+        """每個函數有 callers 個呼叫者 (由雜湊決定，可能重複)"""
+        return [mix(index * 31 + k) % self.functions for k in range(self.callers)]
+
+    # 字串
+
+    def string_ea(self, index: int) -> int:
+        return STRING_BASE + index * STRING_SIZE
+
+    def string_index(self, ea: int) -> Optional[int]:
+        if STRING_BASE <= ea < STRING_BASE + self.strings * STRING_SIZE:
+            return (ea - STRING_BASE) // STRING_SIZE
+        return None
+
+    def string_value(self, index: int) -> str:
+        return 'wps_string_%06d' % index
+
+    def data_refs_from(self, ea: int) -> List[int]:
+        """最後一個指令有 string_refs 的機率引用一個字串"""
+        index = self.function_index(ea)
+        if index is None or (ea - self.function_start(index)) // 4 != self.instructions - 1:
+            return []
+        h = mix(ea ^ 0x5BD1E995)
+        if (h & 0xFFFF) >= self.string_refs * 0x10000:
+            return []
+        return [self.string_ea((h >> 16) % self.strings)]
+
+    # 修改與關閉 (測試增量更新)
+
+    def patch(self, ea: int) -> None:
+        """修改 ea 所在函數的內容，並通知已註冊的 IDB hooks"""
+        index = self.function_index(ea)
+        if index is None:
+            return
+        self.versions[index] = self.versions.get(index, 0) + 1
+        for hook in list(self.hooks):
+            hook.byte_patched(ea, 0)
+
+    def close(self) -> None:
+        """關閉資料庫: 通知 IDP hooks (closebase)，netnode 保留在資料庫中"""
+        for hook in list(self.idp_hooks):
+            hook.closebase()
+
+class Netnode(object):
+    """netnode 的 supval 部分 (wpsearch.py 只用到這些)"""
+
+    def __init__(self, db: SyntheticDB, name: str):
+        self.db = db
+        self.name = name
+        self.tags = db.netnodes.setdefault(name, {})
+        self.sorted = {}
+
+    def supval(self, index: int, tag: str = 'S'):
+        return self.tags.get(tag, {}).get(index)
+
+    def supset(self, index: int, value, tag: str = 'S') -> bool:
+        values = self.tags.setdefault(tag, {})
+        if index not in values:
+            self.sorted.pop(tag, None)
+        values[index] = value
+        return True
+
+    def supdel(self, index: int, tag: str = 'S') -> bool:
+        self.sorted.pop(tag, None)
+        return self.tags.get(tag, {}).pop(index, None) is not None
+
+    def sup1st(self, tag: str = 'S') -> int:
+        return self.supnxt(-1, tag)
+
+    def supnxt(self, current: int, tag: str = 'S') -> int:
+        if tag not in self.sorted:
+            self.sorted[tag] = sorted(self.tags.get(tag, {}))
+        keys = self.sorted[tag]
+        i = bisect.bisect_right(keys, current)
+        return keys[i] if i < len(keys) else BADNODE
+
+    def kill(self) -> None:
+        self.db.netnodes.pop(self.name, None)
+        self.tags = {}
+        self.sorted = {}
+
+BADADDR = 0xFFFFFFFF
+BADNODE = 0xFFFFFFFF
+
+DB = SyntheticDB()
+
+def configure(**kwargs) -> SyntheticDB:
+    """以新的參數重建資料庫 (替身模組都透過 synthetic_db.DB 存取)"""
+    global DB
+    DB = SyntheticDB(**kwargs)
+    return DB
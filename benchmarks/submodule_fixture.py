@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+產生 update_submodules.py 的離線測試環境
+建立 N 個本地 bare repo (可設定歷史深度與 blob 大小) 與一個 .gitmodules 指向它們的 superproject
+"""
+import os
+import sys
+import random
+import subprocess
+from typing import List, Dict
+
+# 讓 superproject 可以從本地路徑 clone submodule (git >= 2.38.1 預設禁止 file 協定)
+GIT_ENV = dict(os.environ, **{
+    'GIT_CONFIG_COUNT': '1',
+    'GIT_CONFIG_KEY_0': 'protocol.file.allow',
+    'GIT_CONFIG_VALUE_0': 'always',
+    'GIT_AUTHOR_NAME': 'bench',
+    'GIT_AUTHOR_EMAIL': 'bench@localhost',
+    'GIT_COMMITTER_NAME': 'bench',
+    'GIT_COMMITTER_EMAIL': 'bench@localhost',
+})
+
+def git(args: List[str], cwd: str = None, stdin: bytes = None) -> str:
+    """執行 git 命令，失敗時直接拋出例外"""
+    result = subprocess.run(['git'] + args, cwd=cwd, input=stdin, env=GIT_ENV,
+                            capture_output=True, check=True)
+    return result.stdout.decode('utf-8', 'replace').strip()
+
+def fast_import_stream(depth: int, blob_size: int, files: int, seed: int) -> bytes:
+    """產生 git fast-import 串流: depth 個 commit，每個 commit 改寫一個 blob"""
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(1, depth + 1):
+        message = f"commit {i}\n".encode()
+        chunks.append(b"commit refs/heads/main\n")
+        chunks.append(f"mark :{i}\n".encode())
+        chunks.append(f"committer bench <bench@localhost> {1700000000 + i} +0000\n".encode())
+        chunks.append(f"data {len(message)}\n".encode() + message)
+        if i > 1:
+            chunks.append(f"from :{i - 1}\n".encode())
+        blob = rng.randbytes(blob_size)
+        chunks.append(f"M 644 inline file_{i % files}.bin\n".encode())
+        chunks.append(f"data {len(blob)}\n".encode() + blob + b"\n")
+    return b''.join(chunks)
+
+def create_remote(path: str, depth: int, blob_size: int, files: int = 4, seed: int = 0) -> List[str]:
+    """建立一個 bare repo，返回依序的 commit sha 列表"""
+    git(['init', '--quiet', '--bare', '--initial-branch=main', path])
+    marks = os.path.join(path, 'bench-marks')
+    git(['fast-import', '--quiet', f'--export-marks={marks}'], cwd=path,
+        stdin=fast_import_stream(depth, blob_size, files, seed))
+
+    shas = {}
+    with open(marks, 'r', encoding='utf-8') as f:
+        for line in f:
+            mark, sha = line.split()
+            shas[int(mark[1:])] = sha
+    os.remove(marks)
+    return [shas[i] for i in sorted(shas)]
+
+def create_remotes(root: str, count: int, depth: int = 20, blob_size: int = 4096,
+                   lag: int = 5) -> List[Dict]:
+    """建立 count 個 bare repo; gitlink 指向落後最新 commit lag 個版本的 commit"""
+    remotes_dir = os.path.join(root, 'remotes')
+    os.makedirs(remotes_dir, exist_ok=True)
+
+    remotes = []
+    for i in range(count):
+        name = f"repo_{i:04d}"
+        url = os.path.join(remotes_dir, name + '.git')
+        shas = create_remote(url, depth, blob_size, seed=i)
+        remotes.append({
+            'name': f"plugins/{name}",
+            'path': f"plugins/{name}",
+            'url': url,
+            'gitlink': shas[max(0, len(shas) - 1 - lag)],
+            'head': shas[-1]
+        })
+    return remotes
+
+def create_superproject(path: str, remotes: List[Dict]) -> str:
+    """建立 superproject: 寫入 .gitmodules 並以 gitlink 登錄所有 submodule (不 checkout)"""
+    git(['init', '--quiet', '--initial-branch=main', path])
+
+    with open(os.path.join(path, '.gitmodules'), 'w', encoding='utf-8') as f:
+        for remote in remotes:
+            f.write(f'[submodule "{remote["name"]}"]\n')
+            f.write(f'\tpath = {remote["path"]}\n')
+            f.write(f'\turl = {remote["url"]}\n')
+
+    index_info = ''.join(f"160000 {r['gitlink']}\t{r['path']}\n" for r in remotes)
+    git(['update-index', '--index-info'], cwd=path, stdin=index_info.encode())
+    git(['add', '.gitmodules'], cwd=path)
+    git(['commit', '--quiet', '-m', f'Add {len(remotes)} submodules'], cwd=path)
+    return path
+
+def main():
+    """主函數"""
+    if len(sys.argv) < 3 or sys.argv[1] in ['-h', '--help']:
+        print("用法: python3 submodule_fixture.py <輸出目錄> <submodule 數量> [--depth N] [--blob-size BYTES] [--lag N]")
+        sys.exit(0 if len(sys.argv) > 1 and sys.argv[1] in ['-h', '--help'] else 1)
+
+    root = os.path.realpath(sys.argv[1])
+    count = int(sys.argv[2])
+    options = {'--depth': 20, '--blob-size': 4096, '--lag': 5}
+    for option in options:
+        if option in sys.argv:
+            options[option] = int(sys.argv[sys.argv.index(option) + 1])
+
+    print(f"🏗️  建立 {count} 個 bare repo (深度 {options['--depth']}, blob {options['--blob-size']} bytes)...")
+    remotes = create_remotes(root, count, options['--depth'], options['--blob-size'], options['--lag'])
+    superproject = create_superproject(os.path.join(root, 'super'), remotes)
+    print(f"✅ superproject: {superproject}")
+    print("   執行前請設定: export GIT_CONFIG_COUNT=1 GIT_CONFIG_KEY_0=protocol.file.allow GIT_CONFIG_VALUE_0=always")
+
+if __name__ == "__main__":
+    main()
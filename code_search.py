@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+整個 plugin 集合的 trigram 程式碼搜尋
+每個 submodule 一個索引段 (以 checkout 的 commit 為鍵，commit 不變就不重建)，以 mmap 讀取，
+查詢時先用 regex 中必須出現的 trigram 篩選候選檔案，再以 regex 比對並輸出路徑與行號
+"""
+import os
+import re
+import sys
+import json
+import mmap
+import time
+import bisect
+import shutil
+import hashlib
+import subprocess
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple
+
+try:
+    import re._parser as sre_parse
+    import re._constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
+
+REPO_DIR = os.path.dirname(os.path.realpath(__file__))
+INDEX_DIR = os.path.join(REPO_DIR, '.code_index')
+ROOT_SEGMENT = '_root'
+MAGIC = b'TRG1'
+HEADER_SIZE = 16
+MAX_FILE_SIZE = 1 << 20
+SOURCE_EXTENSIONS = {
+    '.py', '.pyw', '.idc', '.c', '.cc', '.cpp', '.cxx', '.h', '.hh', '.hpp', '.hxx', '.inc',
+    '.js', '.ts', '.rs', '.go', '.java', '.kt', '.cs', '.rb', '.lua', '.sh', '.ps1', '.cmake',
+    '.yar', '.yara', '.json', '.toml', '.cfg', '.ini', '.yml', '.yaml', '.md', '.rst', '.txt',
+}
+SKIP_DIRS = {'.git', '__pycache__', 'node_modules', '.tox', '.venv', 'venv', '.code_index'}
+
+def run_command(cmd: List[str], cwd: str = REPO_DIR) -> str:
+    """執行命令並返回 stdout，失敗時返回空字串"""
+    result = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True)
+    return result.stdout if result.returncode == 0 else ''
+
+def submodule_commits() -> Dict[str, str]:
+    """一次取得所有已 checkout 的 submodule 與目前的 commit (path -> sha)"""
+    commits = {}
+    for line in run_command(['git', 'submodule', 'status']).splitlines():
+        if not line or line[0] == '-':
+            continue
+        parts = line[1:].split()
+        if len(parts) >= 2 and os.path.isdir(os.path.join(REPO_DIR, parts[1])):
+            commits[parts[1]] = parts[0]
+    return commits
+
+def list_sources(base: str, exclude: set = frozenset()) -> List[str]:
+    """列出目錄下要索引的原始碼檔案 (相對於 repo 根目錄)"""
+    sources = []
+    for current, dirs, files in os.walk(os.path.join(REPO_DIR, base)):
+        rel = os.path.relpath(current, REPO_DIR)
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS
+                         and os.path.normpath(os.path.join(rel, d)) not in exclude)
+        for filename in sorted(files):
+            if os.path.splitext(filename)[1].lower() in SOURCE_EXTENSIONS:
+                sources.append(os.path.normpath(os.path.join(rel, filename)))
+    return sources
+
+def root_key(sources: List[str]) -> str:
+    """非 submodule 的檔案沒有 commit，以所有檔案的 (路徑, mtime, 大小) 計算鍵"""
+    digest = hashlib.sha1()
+    for path in sources:
+        try:
+            st = os.stat(os.path.join(REPO_DIR, path))
+        except OSError:
+            continue
+        digest.update(f'{path}\0{st.st_mtime_ns}\0{st.st_size}\n'.encode())
+    return 'stat:' + digest.hexdigest()
+
+def segment_file(name: str) -> str:
+    """索引段檔名"""
+    return os.path.join(INDEX_DIR, name.replace('/', '__') + '.idx')
+
+def file_trigrams(path: str) -> bytes:
+    """讀取檔案並返回排序後的 trigram (小寫、以 uint32 表示)；二進位或過大的檔案返回空"""
+    try:
+        with open(os.path.join(REPO_DIR, path), 'rb') as f:
+            data = f.read(MAX_FILE_SIZE + 1)
+    except OSError:
+        return b''
+    if len(data) > MAX_FILE_SIZE or b'\0' in data[:8192]:
+        return b''
+
+    data = data.lower()
+    grams = {data[i:i + 3] for i in range(len(data) - 2)}
+    return array('I', sorted(int.from_bytes(g, 'big') for g in grams)).tobytes()
+
+def write_segment(name: str, key: str, sources: List[str], executor: ProcessPoolExecutor) -> int:
+    """建立一個索引段: 標頭 + JSON metadata + trigram/offset/posting 三個 uint32 陣列"""
+    postings = {}
+    files = []
+    for path, grams in zip(sources, executor.map(file_trigrams, sources, chunksize=16)):
+        if not grams:
+            continue
+        file_id = len(files)
+        files.append(path)
+        values = array('I')
+        values.frombytes(grams)
+        for gram in values:
+            postings.setdefault(gram, array('I')).append(file_id)
+
+    trigrams = array('I', sorted(postings))
+    offsets = array('I', [0])
+    flat = array('I')
+    for gram in trigrams:
+        flat.extend(postings[gram])
+        offsets.append(len(flat))
+
+    meta = json.dumps({'segment': name, 'key': key, 'files': files}, ensure_ascii=False).encode()
+    meta += b' ' * (-len(meta) % 4)
+
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    tmp = segment_file(name) + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC + array('I', [len(meta), len(trigrams), len(flat)]).tobytes())
+        f.write(meta)
+        trigrams.tofile(f)
+        offsets.tofile(f)
+        flat.tofile(f)
+    os.replace(tmp, segment_file(name))
+    return len(files)
+
+class Segment(object):
+    """以 mmap 開啟的索引段"""
+
+    def __init__(self, path: str):
+        self.fp = open(path, 'rb')
+        self.map = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:4] != MAGIC:
+            raise ValueError(f'{path}: 不是索引檔')
+
+        meta_len, count, total = array('I', self.map[4:HEADER_SIZE])
+        meta = json.loads(self.map[HEADER_SIZE:HEADER_SIZE + meta_len])
+        self.name, self.key, self.files = meta['segment'], meta['key'], meta['files']
+
+        view = memoryview(self.map)
+        start = HEADER_SIZE + meta_len
+        self.trigrams = view[start:start + count * 4].cast('I')
+        start += count * 4
+        self.offsets = view[start:start + (count + 1) * 4].cast('I')
+        start += (count + 1) * 4
+        self.postings = view[start:start + total * 4].cast('I')
+
+    def lookup(self, gram: int) -> set:
+        """二分搜尋 trigram，返回包含它的檔案編號"""
+        i = bisect.bisect_left(self.trigrams, gram)
+        if i == len(self.trigrams) or self.trigrams[i] != gram:
+            return set()
+        return set(self.postings[self.offsets[i]:self.offsets[i + 1]])
+
+    def close(self) -> None:
+        for view in (self.trigrams, self.offsets, self.postings):
+            view.release()
+        self.map.close()
+        self.fp.close()
+
+def read_segment_key(path: str) -> Optional[str]:
+    """只讀取索引段的鍵 (不載入陣列)"""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+            if header[:4] != MAGIC:
+                return None
+            meta_len = array('I', header[4:8])[0]
+            return json.loads(f.read(meta_len))['key']
+    except (OSError, ValueError, KeyError):
+        return None
+
+def build_index(jobs: int = None, rebuild: bool = False) -> Dict:
+    """增量更新索引: 只重建 commit (或檔案狀態) 有變更的索引段"""
+    commits = submodule_commits()
+    segments = {path: (f'commit:{sha}', None) for path, sha in commits.items()}
+    root_sources = []
+    for entry in sorted(os.listdir(REPO_DIR)):
+        path = os.path.join(REPO_DIR, entry)
+        if entry in SKIP_DIRS or entry.startswith('.'):
+            continue
+        if os.path.isdir(path):
+            root_sources.extend(list_sources(entry, exclude=set(commits)))
+        elif os.path.splitext(entry)[1].lower() in SOURCE_EXTENSIONS:
+            root_sources.append(entry)
+    segments[ROOT_SEGMENT] = (root_key(root_sources), root_sources)
+
+    stats = {'segments': len(segments), 'rebuilt': 0, 'cached': 0, 'removed': 0, 'files': 0}
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for name, (key, sources) in sorted(segments.items()):
+            if not rebuild and read_segment_key(segment_file(name)) == key:
+                stats['cached'] += 1
+                continue
+            count = write_segment(name, key, sources if sources is not None else list_sources(name), executor)
+            stats['rebuilt'] += 1
+            stats['files'] += count
+            print(f"  🔨 {name}: {count} 個檔案")
+
+    # 移除已不存在的 submodule 的索引段
+    wanted = {os.path.basename(segment_file(name)) for name in segments}
+    if os.path.isdir(INDEX_DIR):
+        for filename in os.listdir(INDEX_DIR):
+            if filename.endswith('.idx') and filename not in wanted:
+                os.remove(os.path.join(INDEX_DIR, filename))
+                stats['removed'] += 1
+    return stats
+
+def literal_trigrams(chars: List[int]) -> Optional[Tuple]:
+    """連續字元 (小寫) 的所有 trigram，作為 AND 條件"""
+    data = bytes(chars).lower()
+    if len(data) < 3:
+        return None
+    return ('and', [('gram', int.from_bytes(data[i:i + 3], 'big')) for i in range(len(data) - 2)])
+
+def regex_query(items) -> Optional[Tuple]:
+    """從 regex 語法樹推導必須出現的 trigram 條件 (None 表示無法篩選)"""
+    terms = []
+    run = []
+
+    def flush():
+        query = literal_trigrams(run)
+        if query:
+            terms.append(query)
+        run.clear()
+
+    for op, av in items:
+        if op is sre_constants.LITERAL and av < 128:
+            run.append(av)
+            continue
+        flush()
+        if op is sre_constants.SUBPATTERN:
+            query = regex_query(av[-1])
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+            query = regex_query(av[2])
+        elif op is sre_constants.BRANCH:
+            alternatives = [regex_query(a) for a in av[1]]
+            query = None if any(a is None for a in alternatives) else ('or', alternatives)
+        else:
+            query = None
+        if query:
+            terms.append(query)
+    flush()
+
+    if not terms:
+        return None
+    return terms[0] if len(terms) == 1 else ('and', terms)
+
+def evaluate(query: Optional[Tuple], segment: Segment) -> set:
+    """在索引段中計算候選檔案"""
+    if query is None:
+        return set(range(len(segment.files)))
+    kind, value = query
+    if kind == 'gram':
+        return segment.lookup(value)
+    if kind == 'or':
+        result = set()
+        for sub in value:
+            result |= evaluate(sub, segment)
+        return result
+
+    result = None
+    for sub in value:
+        result = evaluate(sub, segment) if result is None else result & evaluate(sub, segment)
+        if not result:
+            break
+    return result or set()
+
+def search(pattern: str, ignore_case: bool = False, path_filter: str = None) -> Tuple[List[Tuple], Dict]:
+    """查詢索引並以 regex 驗證，返回 [(路徑, 行號, 內容)] 與統計"""
+    flags = re.IGNORECASE if ignore_case else 0
+    regex = re.compile(pattern, flags)
+    query = regex_query(sre_parse.parse(pattern, flags))
+    stats = {'segments': 0, 'candidates': 0, 'files': 0}
+    matches = []
+
+    if not os.path.isdir(INDEX_DIR):
+        return matches, stats
+
+    for filename in sorted(os.listdir(INDEX_DIR)):
+        if not filename.endswith('.idx'):
+            continue
+        segment = Segment(os.path.join(INDEX_DIR, filename))
+        try:
+            stats['segments'] += 1
+            stats['files'] += len(segment.files)
+            candidates = [segment.files[i] for i in sorted(evaluate(query, segment))]
+        finally:
+            segment.close()
+
+        for path in candidates:
+            if path_filter and path_filter not in path:
+                continue
+            stats['candidates'] += 1
+            try:
+                with open(os.path.join(REPO_DIR, path), 'r', encoding='utf-8', errors='replace') as f:
+                    text = f.read()
+            except OSError:
+                continue
+            if not regex.search(text):
+                continue
+            for lineno, line in enumerate(text.splitlines(), 1):
+                if regex.search(line):
+                    matches.append((path, lineno, line.rstrip()))
+    return matches, stats
+
+def main():
+    """主函數"""
+    args = sys.argv[1:]
+    if not args or args[0] in ['-h', '--help']:
+        print("用法: python3 code_search.py index [--rebuild] [--jobs N]")
+        print("      python3 code_search.py search <regex> [-i] [--path 子字串] [--count]")
+        print("")
+        print("範例:")
+        print("  python3 code_search.py index")
+        print("  python3 code_search.py search ui_finish_populating_widget_popup")
+        print("  python3 code_search.py search 'FindImmediate\\s*\\(' --path plugins/")
+        sys.exit(0)
+
+    if args[0] == 'index':
+        jobs = int(args[args.index('--jobs') + 1]) if '--jobs' in args else None
+        start_time = time.time()
+        print("🗂️  更新 trigram 索引...")
+        stats = build_index(jobs, '--rebuild' in args)
+        print(f"✅ {stats['segments']} 個索引段: 重建 {stats['rebuilt']} ({stats['files']} 個檔案)，"
+              f"未變更 {stats['cached']}，移除 {stats['removed']} ({time.time() - start_time:.1f}s)")
+        return
+
+    if args[0] == 'search' and len(args) > 1:
+        if not os.path.isdir(INDEX_DIR):
+            print("❌ 尚未建立索引，請先執行: python3 code_search.py index")
+            sys.exit(1)
+        path_filter = args[args.index('--path') + 1] if '--path' in args else None
+        start_time = time.perf_counter()
+        matches, stats = search(args[1], '-i' in args, path_filter)
+        duration = (time.perf_counter() - start_time) * 1000
+
+        if '--count' not in args:
+            for path, lineno, line in matches:
+                print(f"{path}:{lineno}:{line}")
+        print(f"🔎 {len(matches)} 個結果，{len({m[0] for m in matches})} 個檔案 "
+              f"(候選 {stats['candidates']} / {stats['files']} 個檔案，{duration:.1f} ms)", file=sys.stderr)
+        return
+
+    print(f"❌ 未知的命令: {' '.join(args)}")
+    sys.exit(1)
+
+if __name__ == "__main__":
+    main()
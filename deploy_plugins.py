@@ -0,0 +1,709 @@
+#!/usr/bin/env python3
+"""
+將 plugins/ 下的 submodule 部署到 $IDAUSR/plugins
+自動尋找每個 plugin 的入口檔並建立連結，透過本地 wheel 快取並行安裝 Python 依賴 (支援完全離線)
+"""
+import os
+import re
+import ast
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+
+import plugin_index
+
+try:
+    import tomllib
+    HAS_TOMLLIB = True
+except ImportError:
+    HAS_TOMLLIB = False
+
+REPO_DIR = os.path.dirname(os.path.realpath(__file__))
+PLUGINS_DIR = os.path.join(REPO_DIR, 'plugins')
+MANIFEST = '.ida_plugins_manifest.json'
+WHEEL_INDEX = '.requirements.json'
+DEFAULT_WHEELHOUSE = os.path.join(os.path.expanduser('~'), '.cache', 'ida-plugins', 'wheelhouse')
+
+# 不會出現入口檔的目錄
+SKIP_DIRS = {'.git', '__pycache__', 'test', 'tests', 'doc', 'docs', 'example', 'examples', 'samples'}
+PLUGIN_ENTRY_RE = re.compile(rb'^def\s+PLUGIN_ENTRY\s*\(', re.MULTILINE)
+REQUIREMENT_NAME_RE = re.compile(r'^\s*([A-Za-z0-9][A-Za-z0-9._-]*)')
+
+# --lazy: 以代理 plugin 取代入口檔，第一次 run() 時才 import 真正的 plugin
+PROXY_MARKER = '# Generated by deploy_plugins.py --lazy'
+# 入口檔 import 同目錄模組時，以 shim 從原始目錄載入入口，不把那些模組連結到 $IDAUSR/plugins
+# (IDA 會把 plugins/ 下的每個 .py 都當成 plugin 載入)
+SHIM_MARKER = '# Generated by deploy_plugins.py (entry shim)'
+SHIM_TEMPLATE = '''{marker}; do not edit.
+# Loads {entry} from its own directory, so the modules next to it are
+# importable without being linked into plugins/.
+import os
+import sys
+import importlib.util
+
+REAL_ENTRY = {entry!r}
+MODULE_NAME = {module!r}
+
+directory = os.path.dirname(REAL_ENTRY)
+if directory not in sys.path:
+    sys.path.insert(0, directory)
+spec = importlib.util.spec_from_file_location(MODULE_NAME, REAL_ENTRY)
+module = importlib.util.module_from_spec(spec)
+sys.modules[MODULE_NAME] = module
+spec.loader.exec_module(module)
+
+PLUGIN_ENTRY = module.PLUGIN_ENTRY
+'''
+# 這些 plugin 必須在啟動時載入，無法延遲
+EAGER_FLAGS = {'PLUGIN_FIX', 'PLUGIN_HIDE', 'PLUGIN_PROC', 'PLUGIN_DBG'}
+PROXY_FLAGS = ('PLUGIN_MOD', 'PLUGIN_DRAW', 'PLUGIN_SEG', 'PLUGIN_UNL')
+PROXY_TEMPLATE = '''{marker}; do not edit.
+# Lazy-loading proxy for {entry}
+# The real plugin is imported on the first run().
+import os
+import sys
+import importlib.util
+
+import ida_idaapi
+import ida_kernwin
+
+REAL_ENTRY = {entry!r}
+MODULE_NAME = {module!r}
+
+
+def load_real_plugin():
+    directory = os.path.dirname(REAL_ENTRY)
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    spec = importlib.util.spec_from_file_location(MODULE_NAME, REAL_ENTRY)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[MODULE_NAME] = module
+    spec.loader.exec_module(module)
+    return module.PLUGIN_ENTRY()
+
+
+class lazy_plugin_t(ida_idaapi.plugin_t):
+    flags = {flags}
+    wanted_name = {name!r}
+    wanted_hotkey = {hotkey!r}
+    comment = {comment!r}
+    help = {help!r}
+
+    def __init__(self):
+        ida_idaapi.plugin_t.__init__(self)
+        self.real = None
+        self.target = None
+
+    def load(self):
+        if self.real is None:
+            self.real = load_real_plugin()
+            result = self.real.init()
+            if result == ida_idaapi.PLUGIN_SKIP:
+                ida_kernwin.msg("%s: plugin refused to load\\n" % self.wanted_name)
+            elif isinstance(result, int):
+                self.target = self.real
+            else:
+                # PLUGIN_MULTI: init() returns the plugmod_t that handles run()
+                self.target = result
+        return self.target
+
+    def init(self):
+        return ida_idaapi.PLUGIN_KEEP
+
+    def run(self, arg):
+        target = self.load()
+        return target.run(arg) if target is not None else False
+
+    def term(self):
+        if self.target is not None and self.target is self.real and hasattr(self.real, 'term'):
+            self.real.term()
+
+
+def PLUGIN_ENTRY():
+    return lazy_plugin_t()
+'''
+
+def run_command(cmd: List[str], cwd: str = None, timeout: int = 1800) -> Dict:
+    """執行命令並返回結果"""
+    try:
+        result = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True, timeout=timeout)
+        return {
+            'success': result.returncode == 0,
+            'returncode': result.returncode,
+            'stdout': result.stdout.strip(),
+            'stderr': result.stderr.strip(),
+            'command': ' '.join(cmd)
+        }
+    except subprocess.TimeoutExpired:
+        return {'success': False, 'returncode': -1, 'stdout': '',
+                'stderr': f'命令超時 ({timeout}秒)', 'command': ' '.join(cmd)}
+    except Exception as e:
+        return {'success': False, 'returncode': -1, 'stdout': '', 'stderr': str(e), 'command': ' '.join(cmd)}
+
+def normalize_name(requirement: str) -> Optional[str]:
+    """取得 requirement 的正規化專案名稱 (PEP 503)"""
+    match = REQUIREMENT_NAME_RE.match(requirement)
+    if not match:
+        return None
+    return re.sub(r'[-_.]+', '-', match.group(1)).lower()
+
+def parse_requirements_txt(path: str) -> List[str]:
+    """讀取 requirements.txt，忽略註解、選項與 -r/-e 行"""
+    requirements = []
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line and not line.startswith('-') and normalize_name(line):
+                requirements.append(line)
+    return requirements
+
+def parse_setup_py(path: str) -> List[str]:
+    """以 AST 讀取 setup.py 中字面常數的 install_requires (不執行 setup.py)"""
+    try:
+        with open(path, 'rb') as f:
+            tree = ast.parse(f.read(), path)
+    except (SyntaxError, ValueError):
+        return []
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.keyword) and node.arg == 'install_requires':
+            try:
+                return [r for r in ast.literal_eval(node.value) if normalize_name(r)]
+            except (ValueError, TypeError):
+                return []
+    return []
+
+def parse_pyproject(path: str) -> List[str]:
+    """讀取 pyproject.toml 的 [project].dependencies"""
+    if not HAS_TOMLLIB:
+        return []
+    try:
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+    except (tomllib.TOMLDecodeError, OSError):
+        return []
+    return [r for r in data.get('project', {}).get('dependencies', []) if normalize_name(r)]
+
+def find_requirements(plugin_dir: str) -> List[str]:
+    """收集 plugin 根目錄下宣告的 Python 依賴"""
+    parsers = [
+        ('requirements.txt', parse_requirements_txt),
+        ('setup.py', parse_setup_py),
+        ('pyproject.toml', parse_pyproject),
+    ]
+    requirements = []
+    for filename, parser in parsers:
+        path = os.path.join(plugin_dir, filename)
+        if os.path.isfile(path):
+            requirements.extend(r for r in parser(path) if r not in requirements)
+    return requirements
+
+def find_entry_files(plugin_dir: str, max_depth: int = 2) -> List[str]:
+    """尋找定義 PLUGIN_ENTRY() 的 .py 檔，只保留最淺一層的結果"""
+    entries = []
+    for root, dirs, files in os.walk(plugin_dir):
+        depth = os.path.relpath(root, plugin_dir).count(os.sep) + (root != plugin_dir)
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS and not d.startswith('.'))
+        if depth >= max_depth:
+            dirs[:] = []
+
+        for filename in sorted(files):
+            if not filename.endswith('.py'):
+                continue
+            path = os.path.join(root, filename)
+            try:
+                with open(path, 'rb') as f:
+                    if PLUGIN_ENTRY_RE.search(f.read()):
+                        entries.append((depth, path))
+            except OSError:
+                continue
+
+    if not entries:
+        return []
+    shallowest = min(depth for depth, _ in entries)
+    return [path for depth, path in entries if depth == shallowest]
+
+def find_local_imports(entry: str) -> List[str]:
+    """找出入口檔 import 的同目錄模組/套件 (需一起連結才能被 IDA 載入)"""
+    try:
+        with open(entry, 'rb') as f:
+            tree = ast.parse(f.read(), entry)
+    except (SyntaxError, ValueError):
+        return []
+
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module.split('.')[0])
+
+    entry_dir = os.path.dirname(entry)
+    siblings = []
+    for name in sorted(names):
+        for candidate in (os.path.join(entry_dir, name + '.py'), os.path.join(entry_dir, name)):
+            if os.path.exists(candidate) and candidate != entry:
+                siblings.append(candidate)
+                break
+    return siblings
+
+def discover_plugin(plugin_dir: str) -> Dict:
+    """分析單一 plugin 目錄: 入口檔、需要一起連結的檔案與依賴"""
+    plugin = {
+        'name': os.path.basename(plugin_dir),
+        'path': plugin_dir,
+        'package': False,
+        'links': [],
+        'entries': [],
+        'requirements': find_requirements(plugin_dir)
+    }
+
+    # IDA 9 的 plugin 格式: 整個目錄連結到 plugins/ 下
+    if os.path.isfile(os.path.join(plugin_dir, 'ida-plugin.json')):
+        plugin['package'] = True
+        plugin['links'] = [plugin_dir]
+        try:
+            with open(os.path.join(plugin_dir, 'ida-plugin.json'), 'r', encoding='utf-8') as f:
+                entry_point = json.load(f).get('plugin', {}).get('entryPoint', '')
+            if entry_point:
+                plugin['entries'] = [os.path.join(plugin_dir, entry_point)]
+        except (OSError, ValueError):
+            pass
+        return plugin
+
+    # 同目錄的模組不連結，由 shim 從原始目錄載入 (見 plan_links)
+    plugin['entries'] = find_entry_files(plugin_dir)
+    plugin['links'] = list(plugin['entries'])
+    return plugin
+
+def discover_plugins(base_dir: str = PLUGINS_DIR, names: List[str] = None) -> List[Dict]:
+    """掃描 plugins/ 下所有已 checkout 的 submodule"""
+    if not os.path.isdir(base_dir):
+        return []
+
+    plugins = []
+    for name in sorted(os.listdir(base_dir)):
+        plugin_dir = os.path.join(base_dir, name)
+        if name.startswith('.') or not os.path.isdir(plugin_dir):
+            continue
+        if names and name not in names:
+            continue
+        # 未初始化的 submodule 是空目錄
+        if not os.listdir(plugin_dir):
+            continue
+        plugins.append(discover_plugin(os.path.realpath(plugin_dir)))
+    return plugins
+
+def load_manifest(plugins_dir: str) -> Dict:
+    """讀取部署記錄"""
+    try:
+        with open(os.path.join(plugins_dir, MANIFEST), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'plugins': {}}
+
+def save_manifest(plugins_dir: str, manifest: Dict) -> None:
+    """以原子方式寫入部署記錄"""
+    manifest['timestamp'] = datetime.now().isoformat()
+    fd, tmp = tempfile.mkstemp(prefix=MANIFEST + '.', dir=plugins_dir)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, os.path.join(plugins_dir, MANIFEST))
+
+def lazy_trigger(entry: str, info: Dict = None) -> Tuple[Optional[Dict], str]:
+    """判斷入口是否能用代理延遲載入，返回 (plugin_t 靜態資訊, 觸發時機) 或 (None, 原因)"""
+    info = info or plugin_index.scan_file(entry)
+    if info['error']:
+        return None, info['error']
+    if len(info['plugins']) != 1:
+        return None, f"找到 {len(info['plugins'])} 個 plugin_t 子類別"
+
+    plugin = info['plugins'][0]
+    dynamic = [f for f in plugin_index.METADATA_FIELDS if plugin[f] is None]
+    if dynamic or not plugin['wanted_name']:
+        return None, f"{', '.join(dynamic) or 'wanted_name'} 不是字串常數"
+
+    flags = plugin['flags'] or {'names': [], 'resolvable': True, 'expr': '0'}
+    if not flags['resolvable']:
+        return None, f"無法靜態判斷 flags ({flags['expr']})"
+    eager = EAGER_FLAGS & set(flags['names'])
+    if eager:
+        return None, ', '.join(sorted(eager))
+
+    # init() 會註冊選單/熱鍵/事件: 每次開啟資料庫都要執行，不能延遲到第一次 run()
+    # (ready_to_run 每個 IDA session 只觸發一次，之後開啟的資料庫等不到)
+    if plugin['init_registers']:
+        return None, 'init() 註冊選單/熱鍵/事件'
+    return plugin, 'run'
+
+def render_proxy(entry: str, plugin: Dict) -> str:
+    """產生代理 plugin 的原始碼"""
+    names = [f for f in PROXY_FLAGS if f in ((plugin['flags'] or {}).get('names') or [])]
+    return PROXY_TEMPLATE.format(
+        marker=PROXY_MARKER,
+        entry=entry,
+        module='__plugins__' + os.path.splitext(os.path.basename(entry))[0],
+        flags=' | '.join(f'ida_idaapi.{f}' for f in names) or '0',
+        name=plugin['wanted_name'],
+        hotkey=plugin['wanted_hotkey'],
+        comment=plugin['comment'],
+        help=plugin['help']
+    )
+
+def render_shim(entry: str) -> str:
+    """產生從原始目錄載入入口檔的 shim 原始碼"""
+    return SHIM_TEMPLATE.format(
+        marker=SHIM_MARKER,
+        entry=entry,
+        module='__plugins__' + os.path.splitext(os.path.basename(entry))[0]
+    )
+
+def is_generated(path: str, markers: Tuple[str, ...] = (PROXY_MARKER, SHIM_MARKER)) -> bool:
+    """是否為部署時產生的檔案 (--lazy 代理或 shim)"""
+    if os.path.islink(path) or not os.path.isfile(path):
+        return False
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        head = f.read(max(len(m) for m in markers))
+    return any(head.startswith(m) for m in markers)
+
+def plan_links(plugin: Dict, lazy: bool = False, infos: Dict[str, Dict] = None) -> List[Dict]:
+    """決定要在 $IDAUSR/plugins 建立的項目: symlink 或代理檔 (infos: 入口檔的 plugin_index 分析結果)"""
+    if plugin['package']:
+        return [{'name': plugin['name'], 'src': plugin['path'], 'proxy': None, 'mode': 'link'}]
+
+    items = []
+    infos = infos or {}
+    for entry in plugin['entries']:
+        proxy, trigger = lazy_trigger(entry, infos.get(entry)) if lazy else (None, '')
+        if proxy:
+            # 代理從原始目錄載入真正的 plugin，不需要連結同目錄的檔案
+            items.append({'name': os.path.basename(entry), 'src': entry,
+                          'proxy': render_proxy(entry, proxy), 'mode': f'lazy:{trigger}'})
+            continue
+        if find_local_imports(entry):
+            items.append({'name': os.path.basename(entry), 'src': entry, 'proxy': render_shim(entry),
+                          'mode': f'shim ({trigger})' if lazy else 'shim'})
+        else:
+            items.append({'name': os.path.basename(entry), 'src': entry, 'proxy': None,
+                          'mode': f'link ({trigger})' if lazy else 'link'})
+    return items
+
+def link_plugin(plugin: Dict, items: List[Dict], plugins_dir: str, owned: Dict[str, str]) -> Dict:
+    """將 plugin 的入口以 symlink (或產生的代理檔/shim) 部署到 $IDAUSR/plugins"""
+    result = {'name': plugin['name'], 'linked': [], 'unchanged': [], 'conflicts': []}
+
+    for item in items:
+        link_name, src = item['name'], item['src']
+        dst = os.path.join(plugins_dir, link_name)
+
+        if item['proxy'] is None and os.path.islink(dst) and os.readlink(dst) == src:
+            result['unchanged'].append(link_name)
+            continue
+        if item['proxy'] is not None and is_generated(dst):
+            with open(dst, 'r', encoding='utf-8') as f:
+                if f.read() == item['proxy']:
+                    result['unchanged'].append(link_name)
+                    continue
+        # 已存在且不是這個 plugin 建立的連結: 不覆蓋
+        if os.path.lexists(dst) and owned.get(link_name) != plugin['name']:
+            result['conflicts'].append(link_name)
+            continue
+
+        tmp = os.path.join(plugins_dir, f'.{link_name}.tmp')
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        if item['proxy'] is None:
+            os.symlink(src, tmp)
+        else:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(item['proxy'])
+        os.replace(tmp, dst)
+        result['linked'].append(link_name)
+
+    return result
+
+def unlink_plugins(plugins_dir: str, manifest: Dict, names: List[str] = None) -> List[str]:
+    """移除部署記錄中屬於指定 plugin 的連結"""
+    removed = []
+    for name in sorted(manifest['plugins']):
+        if names and name not in names:
+            continue
+        for link_name in manifest['plugins'][name]['links']:
+            dst = os.path.join(plugins_dir, link_name)
+            if os.path.islink(dst) or is_generated(dst):
+                os.remove(dst)
+                removed.append(link_name)
+        del manifest['plugins'][name]
+    return removed
+
+def collect_requirements(plugins: List[Dict]) -> Dict[str, Dict]:
+    """合併所有 plugin 的依賴，依專案名稱去重"""
+    requirements = {}
+    for plugin in plugins:
+        for requirement in plugin['requirements']:
+            name = normalize_name(requirement)
+            entry = requirements.setdefault(name, {'specs': [], 'plugins': []})
+            if requirement not in entry['specs']:
+                entry['specs'].append(requirement)
+            if plugin['name'] not in entry['plugins']:
+                entry['plugins'].append(plugin['name'])
+    return requirements
+
+def load_wheel_index(wheelhouse: str) -> Dict[str, List[str]]:
+    """讀取 wheelhouse 的索引: requirement -> 對應的 wheel 檔"""
+    try:
+        with open(os.path.join(wheelhouse, WHEEL_INDEX), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def build_wheel(python: str, wheelhouse: str, name: str, specs: List[str]) -> Dict:
+    """為單一專案 (含其依賴) 建立 wheel 到 wheelhouse
+    每個工作先輸出到自己的暫存目錄 (已在 wheelhouse 的 wheel 也會被複製過來)，
+    因此暫存目錄的內容正好是這個專案需要的 wheel，不會混入並行工作的結果
+    """
+    start_time = time.time()
+    job_dir = tempfile.mkdtemp(prefix='.build-', dir=wheelhouse)
+    try:
+        result = run_command([python, '-m', 'pip', 'wheel', '--quiet', '--disable-pip-version-check',
+                              '--wheel-dir', job_dir, '--find-links', wheelhouse] + specs)
+        wheels = sorted(f for f in os.listdir(job_dir) if f.endswith('.whl'))
+        if result['success']:
+            for wheel in wheels:
+                os.replace(os.path.join(job_dir, wheel), os.path.join(wheelhouse, wheel))
+    finally:
+        shutil.rmtree(job_dir, ignore_errors=True)
+
+    return {
+        'name': name,
+        'success': result['success'],
+        'wheels': wheels,
+        'error': result['stderr'],
+        'duration': time.time() - start_time
+    }
+
+def install_requirements(requirements: Dict[str, Dict], python: str, wheelhouse: str,
+                         offline: bool = False, jobs: int = 4) -> Dict:
+    """並行填充 wheel 快取，然後以單次離線 pip install 安裝全部依賴"""
+    os.makedirs(wheelhouse, exist_ok=True)
+    index = load_wheel_index(wheelhouse)
+    report = {'cached': [], 'built': [], 'failed': [], 'installed': False, 'error': ''}
+
+    def cache_key(name: str) -> str:
+        return ';'.join(sorted(requirements[name]['specs']))
+
+    pending = []
+    for name in sorted(requirements):
+        wheels = index.get(cache_key(name), [])
+        if wheels and all(os.path.exists(os.path.join(wheelhouse, w)) for w in wheels):
+            report['cached'].append(name)
+        elif offline:
+            # 離線模式只能使用已存在的 wheel，交給 pip 判斷是否足夠
+            report['cached'].append(name)
+        else:
+            pending.append(name)
+
+    if pending:
+        print(f"📦 建立 {len(pending)} 個依賴的 wheel (並行數 {jobs})...")
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(build_wheel, python, wheelhouse, name, requirements[name]['specs'])
+                       for name in pending]
+            for future in futures:
+                built = future.result()
+                if built['success']:
+                    index[cache_key(built['name'])] = built['wheels']
+                    report['built'].append(built['name'])
+                    print(f"  ✅ {built['name']} ({built['duration']:.1f}s)")
+                else:
+                    report['failed'].append(built['name'])
+                    print(f"  ❌ {built['name']}: {built['error'].splitlines()[-1] if built['error'] else ''}")
+
+        with open(os.path.join(wheelhouse, WHEEL_INDEX), 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+
+    specs = [spec for name in sorted(requirements) if name not in report['failed']
+             for spec in requirements[name]['specs']]
+    if not specs:
+        return report
+
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+        f.write('\n'.join(specs) + '\n')
+        requirements_file = f.name
+    try:
+        result = run_command([python, '-m', 'pip', 'install', '--quiet', '--disable-pip-version-check',
+                              '--no-index', '--find-links', wheelhouse, '-r', requirements_file])
+    finally:
+        os.remove(requirements_file)
+
+    report['installed'] = result['success']
+    report['error'] = result['stderr']
+    return report
+
+def main():
+    """主函數"""
+    args = sys.argv[1:]
+
+    def option(name: str, default=None):
+        if name in args:
+            index = args.index(name)
+            value = args[index + 1]
+            del args[index:index + 2]
+            return value
+        return default
+
+    plugin_names = option('--plugins')
+    plugin_names = plugin_names.split(',') if plugin_names else None
+    python = option('--python', sys.executable)
+    wheelhouse = os.path.realpath(option('--wheelhouse', DEFAULT_WHEELHOUSE))
+    jobs = max(1, int(option('--jobs', '4')))
+    flags = {a for a in args if a.startswith('--')}
+    positional = [a for a in args if not a.startswith('--')]
+
+    idausr = positional[0] if positional else os.environ.get('IDAUSR')
+    if not idausr:
+        print("❌ 請指定 IDAUSR 目錄或設定 IDAUSR 環境變數")
+        sys.exit(1)
+
+    plugins_dir = os.path.join(os.path.realpath(idausr), 'plugins')
+    os.makedirs(plugins_dir, exist_ok=True)
+    manifest = load_manifest(plugins_dir)
+
+    print("🚚 部署 IDA plugins")
+    print("=" * 60)
+    print(f"目標: {plugins_dir}")
+
+    if '--remove' in flags:
+        removed = unlink_plugins(plugins_dir, manifest, plugin_names)
+        save_manifest(plugins_dir, manifest)
+        print(f"🗑️ 已移除 {len(removed)} 個連結")
+        return
+
+    plugins = discover_plugins(PLUGINS_DIR, plugin_names)
+    if not plugins:
+        print("📭 plugins/ 下沒有已 checkout 的 plugin (請先執行 update_submodules.py)")
+        return
+
+    deployable = [p for p in plugins if p['links']]
+    print(f"找到 {len(plugins)} 個 plugin，其中 {len(deployable)} 個有入口檔")
+    for plugin in plugins:
+        if not plugin['links']:
+            print(f"  ⚠️ {plugin['name']}: 找不到 PLUGIN_ENTRY 或 ida-plugin.json，略過")
+    print()
+
+    if '--dry-run' in flags:
+        for plugin in deployable:
+            print(f"  • {plugin['name']}: {', '.join(os.path.relpath(l, plugin['path']) or '.' for l in plugin['links'])}")
+            if plugin['requirements']:
+                print(f"    依賴: {', '.join(plugin['requirements'])}")
+        return
+
+    # 建立連結
+    owned = {link: name for name, info in manifest['plugins'].items() for link in info['links']}
+    conflicts = 0
+    lazy = '--lazy' in flags
+    modes = {}
+    # 透過 plugin_index 的快取一次取得所有入口的靜態資訊 (索引只讀寫一次)
+    infos = plugin_index.cached_scan([e for p in deployable for e in p['entries']]) if lazy else {}
+    for plugin in deployable:
+        items = plan_links(plugin, lazy, infos)
+        result = link_plugin(plugin, items, plugins_dir, owned)
+        links = result['linked'] + result['unchanged']
+
+        # 入口檔改名或移除 (或切換 --lazy) 後留下的舊連結
+        for link_name in manifest['plugins'].get(plugin['name'], {}).get('links', []):
+            dst = os.path.join(plugins_dir, link_name)
+            if link_name not in links and (os.path.islink(dst) or is_generated(dst)):
+                os.remove(dst)
+        if links:
+            manifest['plugins'][plugin['name']] = {'path': plugin['path'], 'links': links}
+        if lazy:
+            for item in items:
+                if item['src'] in plugin['entries']:
+                    modes[f"{plugin['name']}/{item['name']}"] = item['mode']
+        for link_name in result['conflicts']:
+            conflicts += 1
+            print(f"  ⚠️ {plugin['name']}: {link_name} 已存在，未覆蓋")
+        if result['linked']:
+            print(f"  🔗 {plugin['name']}: {', '.join(result['linked'])}")
+
+    save_manifest(plugins_dir, manifest)
+    print(f"✅ 已部署 {len(manifest['plugins'])} 個 plugin，{conflicts} 個衝突")
+
+    if lazy:
+        proxied = sum(1 for mode in modes.values() if mode.startswith('lazy'))
+        print(f"💤 延遲載入: {proxied} / {len(modes)} 個入口")
+        for name, mode in sorted(modes.items()):
+            print(f"  • {name}: {mode}")
+
+    # 以 IDA 的直譯器預先編譯 (只編譯有變更的檔案)
+    # 編譯部署後的連結路徑本身，pyc 才會落在 IDA 匯入時查找的 __pycache__
+    if '--compile' in flags:
+        print()
+        paths = []
+        for plugin in deployable:
+            links = [os.path.join(plugins_dir, link)
+                     for link in manifest['plugins'].get(plugin['name'], {}).get('links', [])]
+            paths += links
+            # 代理檔與 shim 從原始目錄 import 真正的入口與同目錄模組
+            if any(is_generated(link) for link in links):
+                paths.append(plugin['path'])
+        if not paths:
+            print("📭 沒有已部署的連結需要編譯")
+        else:
+            sys.stdout.flush()
+            subprocess.call([python, os.path.join(REPO_DIR, 'precompile_plugins.py')] + paths + ['--jobs', str(jobs)])
+
+    # 安裝依賴
+    if '--no-deps' in flags:
+        return
+
+    requirements = collect_requirements(deployable)
+    if not requirements:
+        return
+
+    shared = [name for name, entry in requirements.items() if len(entry['plugins']) > 1]
+    print()
+    print(f"🐍 共 {len(requirements)} 個依賴 ({len(shared)} 個被多個 plugin 共用)，wheelhouse: {wheelhouse}")
+    report = install_requirements(requirements, python, wheelhouse, '--offline' in flags, jobs)
+
+    print(f"  • 快取命中: {len(report['cached'])}")
+    print(f"  • 新建 wheel: {len(report['built'])}")
+    if report['failed']:
+        print(f"  • 失敗: {', '.join(report['failed'])}")
+    if report['installed']:
+        print("✅ 依賴安裝完成")
+    else:
+        print(f"❌ 依賴安裝失敗: {report['error']}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in ['-h', '--help']:
+        print("用法: python3 deploy_plugins.py [IDAUSR] [選項]")
+        print("")
+        print("選項:")
+        print("  --plugins a,b      只部署指定的 plugin (plugins/ 下的目錄名稱)")
+        print("  --python PATH      安裝依賴用的 Python (IDA 使用的直譯器，預設為目前的 python3)")
+        print(f"  --wheelhouse DIR   wheel 快取目錄 (預設 {DEFAULT_WHEELHOUSE})")
+        print("  --offline          不連網，只從 wheelhouse 安裝")
+        print("  --no-deps          只建立連結，不安裝依賴")
+        print("  --lazy             以代理 plugin 延遲 import，第一次執行時才載入真正的 plugin")
+        print("                     (init() 會註冊選單/熱鍵/事件的 plugin 照常連結)")
+        print("  --compile          以 --python 指定的直譯器預先編譯已部署的 plugin (precompile_plugins.py)")
+        print("  --jobs N           並行建立 wheel 數 (預設 4)")
+        print("  --dry-run          只列出會部署的檔案與依賴")
+        print("  --remove           移除先前部署的連結")
+        print("  -h, --help         顯示此說明")
+        print("")
+        print("範例:")
+        print("  python3 deploy_plugins.py $IDAUSR")
+        print("  python3 deploy_plugins.py $IDAUSR --python python3.11 --offline --wheelhouse ./wheelhouse")
+        sys.exit(0)
+
+    main()
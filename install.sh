@@ -12,4 +12,7 @@ if [ -z "$IDADIR" ]; then
 fi
 
 
-echo "==== install plugins a ===="
\ No newline at end of file
+echo "==== install plugins ===="
+# 連結 plugins/ 下的入口檔到 $IDAUSR/plugins 並安裝依賴
+# 離線安裝: 加上 --offline --wheelhouse <預先準備好的 wheel 目錄>
+python3 "$(dirname "$0")/deploy_plugins.py" "$IDAUSR" "$@"
\ No newline at end of file
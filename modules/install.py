@@ -2,34 +2,229 @@
 
 import os
 import sys
+import json
 import shutil
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
-try:
-    py_module_path = os.path.realpath(os.path.join(sys.argv[1], 'python'))
-    try:
-        install = sys.argv[2] != '--remove'
-    except IndexError as e:
-        install = True
-except IndexError as e:
-    print ("Usage: %s <IDA install path> [--install | --remove]" % sys.argv[0])
+# Written into IDA's python directory; records what we installed so that
+# reinstalls only touch changed files and --remove can roll everything back.
+MANIFEST = '.ida_modules_manifest.json'
+BACKUP_DIR = '.ida_modules_backup'
+
+def usage():
+    print ("Usage: %s <IDA install path> [--install | --remove] [--symlink | --hardlink] [--jobs N]" % sys.argv[0])
     sys.exit(1)
 
-source_path = os.path.dirname(os.path.realpath(__file__))
+def file_hash(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1 << 16), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def stat_key(path):
+    st = os.lstat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+def find_modules(source_path):
+    '''
+    Returns a dict of module name -> source file for every <name>/<name>.py
+    under source_path. Directories without a matching .py file are skipped.
+    '''
+    modules = {}
+
+    for name in sorted(os.listdir(source_path)):
+        module_dir = os.path.join(source_path, name)
+        if name.startswith('.') or name == '__pycache__' or not os.path.isdir(module_dir):
+            continue
+
+        src = os.path.join(module_dir, name + '.py')
+        if os.path.isfile(src):
+            modules[name] = src
+        else:
+            print ("Skipping %s: %s not found" % (name, os.path.relpath(src, source_path)))
+
+    return modules
+
+def load_manifest(py_module_path):
+    try:
+        with open(os.path.join(py_module_path, MANIFEST)) as fp:
+            return json.load(fp)
+    except (IOError, OSError, ValueError):
+        return {'modules': {}}
+
+def save_manifest(py_module_path, manifest):
+    path = os.path.join(py_module_path, MANIFEST)
+    if not manifest['modules']:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+
+    fd, tmp = tempfile.mkstemp(prefix=MANIFEST + '.', dir=py_module_path)
+    with os.fdopen(fd, 'w') as fp:
+        json.dump(manifest, fp, indent=2, sort_keys=True)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+def atomic_place(src, dst, mode):
+    '''
+    Creates dst as a copy of / link to src next to its final location and
+    renames it into place, so IDA never sees a partially written module.
+    '''
+    fd, tmp = tempfile.mkstemp(prefix='.' + os.path.basename(dst) + '.', dir=os.path.dirname(dst))
+    os.close(fd)
+
+    try:
+        if mode == 'copy':
+            shutil.copyfile(src, tmp)
+            shutil.copymode(src, tmp)
+        else:
+            os.remove(tmp)
+            if mode == 'symlink':
+                os.symlink(src, tmp)
+            else:
+                os.link(src, tmp)
+        os.replace(tmp, dst)
+    except Exception:
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        raise
+
+def is_current(entry, src, dst, mode):
+    '''
+    Cheap up-to-date check based on the recorded stat of both files; avoids
+    rehashing anything when nothing changed since the last install.
+    '''
+    if not entry or entry['mode'] != mode or not os.path.lexists(dst):
+        return False
+    if entry['src_stat'] != stat_key(src) or entry['dst_stat'] != stat_key(dst):
+        return False
+    if mode == 'symlink':
+        return os.readlink(dst) == src
+    if mode == 'hardlink':
+        return os.path.samefile(src, dst)
+    return True
+
+def install_module(py_module_path, name, src, entry, mode):
+    '''
+    Installs a single module. Returns (action, manifest entry).
+    '''
+    dst = os.path.join(py_module_path, name + '.py')
+
+    if is_current(entry, src, dst, mode):
+        return ('unchanged', entry)
+
+    digest = file_hash(src)
+    backup = entry.get('backup') if entry else None
 
-if install:
-    print ("Installing python modules from %s to %s..." % (source_path, py_module_path))
-else:
-    print ("Removing python modules from %s..." % py_module_path)
+    if entry is None and os.path.lexists(dst):
+        # Not ours; keep the original so --remove can put it back
+        if mode == 'copy' and not os.path.islink(dst) and file_hash(dst) == digest:
+            return ('adopted', dict(sha256=digest, mode=mode, backup=None,
+                                    src_stat=stat_key(src), dst_stat=stat_key(dst)))
+        backup = os.path.join(BACKUP_DIR, name + '.py')
+        backup_path = os.path.join(py_module_path, backup)
+        if not os.path.isdir(os.path.dirname(backup_path)):
+            os.makedirs(os.path.dirname(backup_path))
+        os.replace(dst, backup_path)
+    elif entry and entry['mode'] == mode == 'copy' and entry['sha256'] == digest and \
+            os.path.isfile(dst) and not os.path.islink(dst) and file_hash(dst) == digest:
+        # Only timestamps changed
+        return ('unchanged', dict(entry, src_stat=stat_key(src), dst_stat=stat_key(dst)))
 
-for py_module in next(os.walk('.'))[1]:
-    src = os.path.join(source_path, py_module, py_module + '.py')
-    dst = os.path.join(py_module_path, py_module + '.py')
+    atomic_place(src, dst, mode)
+    return ('installed', dict(sha256=digest, mode=mode, backup=backup,
+                              src_stat=stat_key(src), dst_stat=stat_key(dst)))
+
+def remove_module(py_module_path, name, entry):
+    dst = os.path.join(py_module_path, name + '.py')
+
+    if os.path.lexists(dst):
+        os.remove(dst)
+
+    backup = entry.get('backup') if entry else None
+    if backup and os.path.lexists(os.path.join(py_module_path, backup)):
+        os.replace(os.path.join(py_module_path, backup), dst)
+        return 'restored'
+    return 'removed'
+
+def main():
+    try:
+        py_module_path = os.path.realpath(os.path.join(sys.argv[1], 'python'))
+    except IndexError:
+        usage()
+
+    install = '--remove' not in sys.argv[2:]
+    mode = 'symlink' if '--symlink' in sys.argv else 'hardlink' if '--hardlink' in sys.argv else 'copy'
+    jobs = 8
+    if '--jobs' in sys.argv:
+        try:
+            jobs = max(1, int(sys.argv[sys.argv.index('--jobs') + 1]))
+        except (IndexError, ValueError):
+            usage()
+
+    source_path = os.path.dirname(os.path.realpath(__file__))
+    manifest = load_manifest(py_module_path)
+    installed = manifest['modules']
 
     if install:
-        print ("Installing %s..." % py_module)
-        shutil.copyfile(src, dst)
+        print ("Installing python modules from %s to %s (%s)..." % (source_path, py_module_path, mode))
+        modules = find_modules(source_path)
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = dict((name, pool.submit(install_module, py_module_path, name, src, installed.get(name), mode))
+                           for (name, src) in modules.items())
+
+        failed = False
+        unchanged = 0
+        for (name, future) in sorted(futures.items()):
+            try:
+                (action, installed[name]) = future.result()
+            except (IOError, OSError) as e:
+                print ("Failed to install %s: %s" % (name, e))
+                failed = True
+                continue
+            if action == 'unchanged':
+                unchanged += 1
+            else:
+                print ("%s %s" % (action.capitalize(), name))
+
+        # Modules that were installed previously but no longer exist in the source tree
+        for name in sorted(set(installed) - set(modules)):
+            print ("%s %s" % (remove_module(py_module_path, name, installed.pop(name)).capitalize(), name))
+
+        if unchanged:
+            print ("%d module(s) already up to date" % unchanged)
     else:
-        print ("Removing %s..." % py_module)
-        os.remove(dst)
+        print ("Removing python modules from %s..." % py_module_path)
+
+        if not installed:
+            # Installed by an older install.py that did not write a manifest
+            installed = dict((name, None) for name in find_modules(source_path)
+                             if os.path.lexists(os.path.join(py_module_path, name + '.py')))
+
+        failed = False
+        for name in sorted(installed):
+            try:
+                print ("%s %s" % (remove_module(py_module_path, name, installed[name]).capitalize(), name))
+                del installed[name]
+            except (IOError, OSError) as e:
+                print ("Failed to remove %s: %s" % (name, e))
+                failed = True
+
+        # Anything left behind failed to roll back; keep it recorded for the next --remove
+        manifest['modules'] = dict((name, entry) for (name, entry) in installed.items() if entry)
+        backup_dir = os.path.join(py_module_path, BACKUP_DIR)
+        if os.path.isdir(backup_dir) and not os.listdir(backup_dir):
+            os.rmdir(backup_dir)
+
+    save_manifest(py_module_path, manifest)
+    print ("Done.")
+
+    if failed:
+        sys.exit(1)
 
-print ("Done.")
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+以 AST 靜態分析 plugin 原始碼 (不 import、不執行)
+取得 PLUGIN_ENTRY、plugin_t 子類別、wanted_name、熱鍵、flags 與 import 等資訊
+掃描 plugins/、scripts/、modules/ 並以 (路徑, mtime, 大小) 快取結果，重新掃描時只分析有變更的檔案
+"""
+import os
+import re
+import ast
+import sys
+import gzip
+import json
+import time
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple
+
+REPO_DIR = os.path.dirname(os.path.realpath(__file__))
+SCAN_ROOTS = ['plugins', 'scripts', 'modules']
+INDEX_FILE = os.path.join(REPO_DIR, '.plugin_index.json.gz')
+INDEX_VERSION = 2
+SKIP_DIRS = {'.git', '__pycache__', '.tox', '.venv', 'venv', 'node_modules'}
+
+PLUGIN_FLAGS = {
+    'PLUGIN_MOD', 'PLUGIN_DRAW', 'PLUGIN_SEG', 'PLUGIN_UNL', 'PLUGIN_HIDE', 'PLUGIN_DBG',
+    'PLUGIN_PROC', 'PLUGIN_FIX', 'PLUGIN_MULTI', 'PLUGIN_SCRIPTED',
+    # 常被誤用在 flags 的 init() 回傳值
+    'PLUGIN_SKIP', 'PLUGIN_OK', 'PLUGIN_KEEP',
+}
+# 在 init() 中呼叫這些函式代表 plugin 需要在啟動時就註冊事件/選單
+REGISTRATION_CALLS = {
+    'hook', 'register_action', 'attach_action_to_menu', 'attach_action_to_toolbar', 'attach_action_to_popup',
+    'add_hotkey', 'add_menu_item', 'create_menu', 'register_timer', 'install_hexrays_callback',
+    'AddHotkey', 'add_idc_hotkey', 'register_custom_data_type', 'register_custom_data_format',
+}
+METADATA_FIELDS = ('wanted_name', 'wanted_hotkey', 'comment', 'help')
+
+def attribute_name(node: ast.AST) -> str:
+    """取得 Name / Attribute 節點最後一段名稱 (idaapi.plugin_t -> plugin_t)"""
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Name):
+        return node.id
+    return ''
+
+def literal(node: ast.AST) -> Optional[str]:
+    """字串常數才回傳值，其他表達式回傳 None"""
+    try:
+        value = ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return None
+    return value if isinstance(value, str) else None
+
+def flag_names(node: ast.AST) -> Optional[set]:
+    """將 flags 表達式化為 PLUGIN_* 名稱集合; 含其他變數或非 0 數字時無法靜態判斷，回傳 None"""
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.BitOr, ast.Add)):
+        left, right = flag_names(node.left), flag_names(node.right)
+        return None if left is None or right is None else left | right
+    if isinstance(node, ast.Constant) and node.value == 0:
+        return set()
+    name = attribute_name(node)
+    if name in PLUGIN_FLAGS and (isinstance(node, ast.Name) or attribute_name(node.value) in ('idaapi', 'ida_idaapi')):
+        return {name}
+    return None
+
+def parse_flags(node: ast.AST) -> Dict:
+    """解析 flags 表達式"""
+    names = flag_names(node)
+    return {'expr': ast.unparse(node), 'names': sorted(names or ()), 'resolvable': names is not None}
+
+def method_calls(method: ast.FunctionDef) -> set:
+    """列出方法中呼叫的函式名稱"""
+    return {attribute_name(n.func) for n in ast.walk(method) if isinstance(n, ast.Call)}
+
+def scan_plugin_class(node: ast.ClassDef, functions: Dict[str, ast.FunctionDef] = None) -> Dict:
+    """讀取 plugin_t 子類別的類別屬性與 init() 行為 (functions: 模組層級的函式定義)"""
+    info = {'class': node.name, 'lineno': node.lineno, 'flags': None, 'init_registers': False}
+    # 未定義時為 ''，非字串常數 (執行時才決定) 時為 None
+    info.update({field: '' for field in METADATA_FIELDS})
+    methods = {}
+
+    for statement in node.body:
+        if isinstance(statement, ast.Assign):
+            for target in statement.targets:
+                if isinstance(target, ast.Name) and target.id in METADATA_FIELDS:
+                    info[target.id] = literal(statement.value)
+                elif isinstance(target, ast.Name) and target.id == 'flags':
+                    info['flags'] = parse_flags(statement.value)
+        elif isinstance(statement, ast.FunctionDef):
+            methods[statement.name] = statement
+
+    # init() 與它 (遞迴) 呼叫的 self 方法、模組層級函式中是否註冊了事件、選單或熱鍵
+    if 'init' in methods:
+        functions = functions or {}
+        calls, pending, visited = set(), [methods['init']], set()
+        while pending:
+            function = pending.pop()
+            if id(function) in visited:
+                continue
+            visited.add(id(function))
+            found = method_calls(function)
+            calls |= found
+            pending.extend(methods.get(name) or functions[name] for name in found
+                           if name in methods or name in functions)
+        info['init_registers'] = bool(calls & REGISTRATION_CALLS)
+    return info
+
+def scan_source(source: bytes, path: str = '<source>') -> Dict:
+    """分析單一 Python 原始碼"""
+    result = {'path': path, 'error': '', 'has_entry': False, 'plugins': [], 'imports': []}
+    try:
+        tree = ast.parse(source, path)
+    except (SyntaxError, ValueError) as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+        return result
+
+    functions = {n.name: n for n in tree.body if isinstance(n, ast.FunctionDef)}
+    imports = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            imports.add(node.module.split('.')[0])
+        elif isinstance(node, ast.ClassDef) and any(attribute_name(b) == 'plugin_t' for b in node.bases):
+            result['plugins'].append(scan_plugin_class(node, functions))
+
+    result['has_entry'] = any(isinstance(n, ast.FunctionDef) and n.name == 'PLUGIN_ENTRY' for n in tree.body)
+    result['imports'] = sorted(imports)
+    return result
+
+def scan_file(path: str) -> Dict:
+    """分析單一檔案"""
+    try:
+        with open(path, 'rb') as f:
+            source = f.read()
+    except OSError as e:
+        return {'path': path, 'error': str(e), 'has_entry': False, 'plugins': [], 'imports': []}
+    return scan_source(source, path)
+
+def iter_sources(roots: List[str]) -> List[str]:
+    """列出所有 .py 檔 (相對於 repo 根目錄)"""
+    sources = []
+    for root in roots:
+        base = os.path.join(REPO_DIR, root)
+        for current, dirs, files in os.walk(base):
+            dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS and not d.startswith('.'))
+            sources.extend(os.path.relpath(os.path.join(current, f), REPO_DIR)
+                           for f in sorted(files) if f.endswith('.py'))
+    return sources
+
+def load_index(index_file: str = INDEX_FILE) -> Dict:
+    """讀取索引檔，格式不符時視為空索引"""
+    try:
+        with gzip.open(index_file, 'rt', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('version') == INDEX_VERSION:
+            return index
+    except (OSError, ValueError, EOFError):
+        pass
+    return {'version': INDEX_VERSION, 'files': {}}
+
+def save_index(index: Dict, index_file: str = INDEX_FILE) -> None:
+    """以壓縮 JSON 原子寫入索引檔 (每次寫入使用唯一的暫存檔，同時執行的部署不會互相覆蓋)"""
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(index_file) + '.', dir=os.path.dirname(index_file))
+    with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8', compresslevel=6) as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, index_file)
+
+def stat_key(path: str) -> Optional[List[int]]:
+    """快取鍵: [mtime_ns, size]"""
+    try:
+        st = os.stat(os.path.join(REPO_DIR, path))
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+def scan_relative(path: str) -> Dict:
+    """在 worker 中分析一個相對路徑的檔案"""
+    result = scan_file(os.path.join(REPO_DIR, path))
+    result['path'] = path
+    return result
+
+def update_index(paths: List[str], index: Dict, jobs: int = None, prune: bool = False) -> Dict:
+    """只重新分析 (mtime, 大小) 有變更的檔案，返回統計"""
+    files = index['files']
+    stats = {'total': len(paths), 'cached': 0, 'scanned': 0, 'removed': 0}
+
+    pending = []
+    for path in paths:
+        key = stat_key(path)
+        entry = files.get(path)
+        if key is None:
+            files.pop(path, None)
+        elif entry and entry['key'] == key:
+            stats['cached'] += 1
+        else:
+            pending.append((path, key))
+
+    if pending:
+        # 少量檔案不值得啟動 process pool
+        if len(pending) < 32 or jobs == 1:
+            results = map(scan_relative, [path for path, _ in pending])
+            for (path, key), result in zip(pending, results):
+                files[path] = dict(result, key=key)
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = executor.map(scan_relative, [path for path, _ in pending], chunksize=64)
+                for (path, key), result in zip(pending, results):
+                    files[path] = dict(result, key=key)
+        stats['scanned'] = len(pending)
+
+    if prune:
+        wanted = set(paths)
+        for path in [p for p in files if p not in wanted]:
+            del files[path]
+            stats['removed'] += 1
+
+    return stats
+
+def cached_scan(paths: List[str]) -> Dict[str, Dict]:
+    """供其他工具使用: 透過索引快取取得指定檔案 (絕對或相對路徑) 的分析結果"""
+    relative = {p: os.path.relpath(os.path.realpath(p), REPO_DIR) for p in paths}
+    index = load_index()
+    inside = [r for r in relative.values() if not r.startswith('..')]
+    update_index(inside, index, jobs=1)
+    if inside:
+        save_index(index)
+    return {p: index['files'].get(r) or scan_file(p) for p, r in relative.items()}
+
+def normalize_hotkey(hotkey: str) -> str:
+    """統一熱鍵寫法: 'Shift-Ctrl-a' 與 'ctrl+shift+A' 都成為 'Ctrl+Shift+A'"""
+    order = {'ctrl': 0, 'alt': 1, 'shift': 2, 'meta': 3}
+    parts = [p.strip() for p in re.split(r'[-+](?=.)', hotkey.strip()) if p.strip()]
+    modifiers = sorted({p.lower() for p in parts[:-1]}, key=lambda m: order.get(m, 9))
+    key = parts[-1].upper() if parts else ''
+    return '+'.join([m.capitalize() for m in modifiers] + [key])
+
+def plugin_group(path: str) -> str:
+    """一個 submodule (plugins/<name>) 或 scripts/、modules/ 下的一個項目視為同一組"""
+    return '/'.join(path.split(os.sep)[:2])
+
+def hotkey_conflicts(index: Dict) -> Dict[str, List[Dict]]:
+    """找出不同 plugin 使用相同熱鍵的情況"""
+    users = {}
+    for path, entry in index['files'].items():
+        if not entry['has_entry']:
+            continue
+        for plugin in entry['plugins']:
+            if plugin['wanted_hotkey']:
+                users.setdefault(normalize_hotkey(plugin['wanted_hotkey']), []).append({
+                    'group': plugin_group(path), 'path': path,
+                    'class': plugin['class'], 'wanted_name': plugin['wanted_name']
+                })
+
+    return {hotkey: entries for hotkey, entries in sorted(users.items())
+            if len({e['group'] for e in entries}) > 1}
+
+def main():
+    """主函數"""
+    args = sys.argv[1:]
+    jobs = int(args[args.index('--jobs') + 1]) if '--jobs' in args else None
+
+    start_time = time.time()
+    index = {'version': INDEX_VERSION, 'files': {}} if '--rebuild' in args else load_index()
+    stats = update_index(iter_sources(SCAN_ROOTS), index, jobs, prune=True)
+    save_index(index)
+    duration = time.time() - start_time
+
+    entries = [(path, entry) for path, entry in sorted(index['files'].items()) if entry['has_entry']]
+    conflicts = hotkey_conflicts(index)
+
+    if '--json' in args:
+        json.dump({'stats': stats, 'entries': [e for _, e in entries], 'hotkey_conflicts': conflicts},
+                  sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return
+
+    print(f"🗂️  {stats['total']} 個檔案: 快取 {stats['cached']}，重新分析 {stats['scanned']}，"
+          f"移除 {stats['removed']} ({duration:.2f}s)")
+    print(f"🔌 {len(entries)} 個 PLUGIN_ENTRY 入口")
+
+    if '--list' in args:
+        for path, entry in entries:
+            for plugin in entry['plugins'] or [{'class': '?', 'wanted_name': '', 'wanted_hotkey': '', 'flags': None}]:
+                flags = plugin['flags']['expr'] if plugin['flags'] else '0'
+                print(f"  • {path}: {plugin['wanted_name'] or plugin['class']} "
+                      f"[{plugin['wanted_hotkey'] or '-'}] flags={flags}")
+
+    errors = [(path, entry['error']) for path, entry in sorted(index['files'].items()) if entry['error']]
+    if errors:
+        print(f"⚠️ {len(errors)} 個檔案無法解析 (例如 Python 2 語法)")
+
+    if conflicts:
+        print(f"\n❌ {len(conflicts)} 個熱鍵衝突:")
+        for hotkey, users in conflicts.items():
+            print(f"  • {hotkey}:")
+            for user in users:
+                print(f"      {user['wanted_name'] or user['class']} ({user['path']})")
+    else:
+        print("✅ 沒有熱鍵衝突")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in ['-h', '--help']:
+        print("用法: python3 plugin_index.py [選項]")
+        print("")
+        print(f"掃描 {', '.join(SCAN_ROOTS)} 並更新 {os.path.basename(INDEX_FILE)}")
+        print("")
+        print("選項:")
+        print("  --list       列出所有 plugin 入口、名稱、熱鍵與 flags")
+        print("  --json       以 JSON 輸出入口與熱鍵衝突")
+        print("  --rebuild    忽略快取重新分析所有檔案")
+        print("  --jobs N     並行分析數 (預設為 CPU 數)")
+        print("  -h, --help   顯示此說明")
+        sys.exit(0)
+
+    main()
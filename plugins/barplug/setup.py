@@ -0,0 +1,2 @@
+from setuptools import setup
+setup(name='bar', install_requires=['six', 'packaging>=20'])
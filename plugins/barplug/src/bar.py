@@ -0,0 +1,2 @@
+def PLUGIN_ENTRY():
+    pass
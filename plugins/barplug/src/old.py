@@ -0,0 +1 @@
+print "py2"
@@ -0,0 +1,5 @@
+import idaapi
+class D(idaapi.plugin_t):
+    wanted_name = "Dup"
+    wanted_hotkey = "shift+ctrl+f"
+def PLUGIN_ENTRY(): return D()
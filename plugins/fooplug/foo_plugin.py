@@ -0,0 +1,10 @@
+import idaapi
+import foolib
+import helper
+class P(idaapi.plugin_t):
+    wanted_name = "Foo"
+    wanted_hotkey = "Ctrl-Shift-F"
+    flags = 0
+def PLUGIN_ENTRY():
+    return P()
+import email.mime.multipart, decimal, http.client
@@ -0,0 +1,17 @@
+from idaapi import *
+from idc import *
+import json, email.mime.text, decimal
+class StarPlugin(plugin_t):
+    flags = PLUGIN_KEEP | PLUGIN_FIX
+    wanted_name = "Star"
+    wanted_hotkey = "Alt-F8"
+    def init(self):
+        msg("hi")
+        class H(UI_Hooks):
+            pass
+        self.h = H(); self.h.hook()
+        for f in Functions(): pass
+        return PLUGIN_KEEP
+    def run(self, arg): pass
+def PLUGIN_ENTRY():
+    return StarPlugin()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+以 IDA 使用的 Python 直譯器預先編譯 plugin 與 module 原始碼到 __pycache__
+使用 checked-hash pyc (內容相同即結果相同，不依賴 mtime)，只重新編譯內容有變更的檔案
+"""
+import os
+import sys
+import json
+import time
+import py_compile
+import subprocess
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Tuple
+
+REPO_DIR = os.path.dirname(os.path.realpath(__file__))
+DEFAULT_TARGETS = [os.path.join(REPO_DIR, 'plugins'), os.path.join(REPO_DIR, 'modules')]
+SKIP_DIRS = {'.git', '__pycache__', '.tox', '.venv', 'venv', 'node_modules'}
+# pyc 標頭 flags: bit 0 = hash-based, bit 1 = check_source
+CHECKED_HASH_FLAGS = 0b11
+
+def find_sources(root: str) -> List[str]:
+    """列出目錄下所有 .py 檔
+    路徑不解析 symlink: 直譯器在匯入路徑旁的 __pycache__ 找 pyc，
+    $IDAUSR/plugins 下的單檔連結要編譯到 $IDAUSR/plugins/__pycache__ 才會被使用
+    """
+    root = os.path.abspath(root)
+    if os.path.isfile(root):
+        return [root] if root.endswith('.py') else []
+
+    sources = []
+    for current, dirs, files in os.walk(root, followlinks=True):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS and not d.startswith('.')]
+        sources.extend(os.path.join(current, f) for f in files if f.endswith('.py'))
+    return sources
+
+def collect_groups(targets: List[str]) -> Dict[str, List[str]]:
+    """依 plugin 分組: plugins/ 或 modules/ 這類集合目錄會展開成每個子目錄 (或單檔) 一組"""
+    groups = {}
+    for target in targets:
+        target = os.path.abspath(target)
+        if os.path.isdir(target) and os.path.basename(target) in ('plugins', 'modules'):
+            for name in sorted(os.listdir(target)):
+                path = os.path.join(target, name)
+                if name.startswith('.') or name in SKIP_DIRS:
+                    continue
+                if os.path.isdir(path):
+                    groups.setdefault(name, []).extend(find_sources(path))
+                elif name.endswith('.py'):
+                    groups.setdefault(name[:-3], []).extend(find_sources(path))
+        else:
+            name = os.path.basename(target.rstrip(os.sep))
+            groups.setdefault(name[:-3] if name.endswith('.py') else name, []).extend(find_sources(target))
+
+    # 同一個路徑只編譯一次 (經由不同連結到達的同一個檔案各自需要 pyc)
+    seen = set()
+    for name in groups:
+        unique = []
+        for source in sorted(set(groups[name])):
+            if source not in seen:
+                seen.add(source)
+                unique.append(source)
+        groups[name] = unique
+    return {name: sources for name, sources in groups.items() if sources}
+
+def is_up_to_date(source: str) -> bool:
+    """檢查既有的 pyc 是否為目前直譯器產生、且 hash 與原始碼相符的 checked-hash pyc"""
+    try:
+        cfile = importlib.util.cache_from_source(source)
+        with open(cfile, 'rb') as f:
+            header = f.read(16)
+        with open(source, 'rb') as f:
+            data = f.read()
+    except (OSError, ValueError):
+        return False
+
+    return (len(header) == 16
+            and header[:4] == importlib.util.MAGIC_NUMBER
+            and int.from_bytes(header[4:8], 'little') == CHECKED_HASH_FLAGS
+            and header[8:16] == importlib.util.source_hash(data))
+
+def compile_source(source: str) -> Tuple[str, str, str]:
+    """編譯單一檔案，返回 (source, 狀態, 錯誤訊息)"""
+    if is_up_to_date(source):
+        return source, 'unchanged', ''
+    try:
+        py_compile.compile(source, doraise=True,
+                           invalidation_mode=py_compile.PycInvalidationMode.CHECKED_HASH)
+        return source, 'compiled', ''
+    except py_compile.PyCompileError as e:
+        return source, 'error', e.msg.strip().splitlines()[-1]
+    except OSError as e:
+        return source, 'error', str(e)
+
+def precompile(groups: Dict[str, List[str]], jobs: int = None) -> Dict[str, Dict]:
+    """並行編譯所有分組，返回每個 plugin 的統計與錯誤"""
+    owner = {source: name for name, sources in groups.items() for source in sources}
+    report = {name: {'files': len(sources), 'compiled': 0, 'unchanged': 0, 'errors': []}
+              for name, sources in groups.items()}
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for source, status, error in executor.map(compile_source, list(owner), chunksize=32):
+            entry = report[owner[source]]
+            if status == 'error':
+                entry['errors'].append({'file': source, 'error': error})
+            else:
+                entry[status] += 1
+    return report
+
+def run_with_interpreter(python: str, argv: List[str]) -> int:
+    """pyc 格式依直譯器版本而異，改用目標直譯器重新執行本腳本"""
+    return subprocess.call([python, os.path.realpath(__file__)] + argv)
+
+def main():
+    """主函數"""
+    args = sys.argv[1:]
+
+    def option(name: str, default=None):
+        if name in args:
+            index = args.index(name)
+            value = args[index + 1]
+            del args[index:index + 2]
+            return value
+        return default
+
+    python = option('--python')
+    if python:
+        sys.exit(run_with_interpreter(python, args))
+
+    jobs = option('--jobs')
+    jobs = max(1, int(jobs)) if jobs else None
+    json_output = option('--json')
+    strict = '--strict' in args
+    targets = [a for a in args if not a.startswith('--')] or [t for t in DEFAULT_TARGETS if os.path.exists(t)]
+
+    print(f"🐍 預先編譯 plugin 原始碼 (Python {sys.version.split()[0]}, checked-hash pyc)")
+    start_time = time.time()
+    groups = collect_groups(targets)
+    if not groups:
+        print("📭 沒有找到任何 .py 檔")
+        return
+
+    report = precompile(groups, jobs)
+
+    compiled = sum(r['compiled'] for r in report.values())
+    unchanged = sum(r['unchanged'] for r in report.values())
+    failed = {name: r for name, r in report.items() if r['errors']}
+
+    for name in sorted(report):
+        entry = report[name]
+        if entry['compiled'] or entry['errors']:
+            mark = '❌' if entry['errors'] else '✅'
+            print(f"  {mark} {name}: 編譯 {entry['compiled']}，未變更 {entry['unchanged']}，錯誤 {len(entry['errors'])}")
+            for error in entry['errors']:
+                print(f"      • {os.path.relpath(error['file'], REPO_DIR)}: {error['error']}")
+
+    print(f"📊 {len(report)} 個 plugin，編譯 {compiled} 個檔案，{unchanged} 個未變更，"
+          f"{len(failed)} 個 plugin 有錯誤 ({time.time() - start_time:.1f}s)")
+
+    if json_output:
+        with open(json_output, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version, 'plugins': report}, f, ensure_ascii=False, indent=2)
+        print(f"📄 報告已保存到: {json_output}")
+
+    if strict and failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in ['-h', '--help']:
+        print("用法: python3 precompile_plugins.py [目錄或檔案...] [選項]")
+        print("")
+        print("預設編譯 plugins/ 與 modules/ 下的所有 .py 檔")
+        print("")
+        print("選項:")
+        print("  --python PATH   IDA 使用的 Python 直譯器 (pyc 依版本而異，預設為目前的直譯器)")
+        print("  --jobs N        並行編譯數 (預設為 CPU 數)")
+        print("  --json FILE     將每個 plugin 的結果寫入 JSON 檔")
+        print("  --strict        有編譯錯誤時以非 0 結束")
+        print("  -h, --help      顯示此說明")
+        print("")
+        print("範例:")
+        print("  python3 precompile_plugins.py --python /usr/local/bin/python3.11")
+        print("  python3 precompile_plugins.py plugins/keypatch --strict")
+        sys.exit(0)
+
+    main()
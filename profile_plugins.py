@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+無需安裝 IDA 的 plugin 載入時間分析
+每個 plugin 入口在獨立子行程中以替身 idaapi/idc/idautils/ida_* 模組載入，
+記錄 import 時間 (-X importtime)、PLUGIN_ENTRY()/init() 時間與記憶體峰值，並依耗時排名
+"""
+import os
+import re
+import ast
+import sys
+import json
+import time
+import builtins
+import tempfile
+import statistics
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Optional
+
+from deploy_plugins import PLUGINS_DIR, discover_plugins
+
+MARKER = '@@IDA_PROFILE@@'
+STAR_IMPORT_RE = re.compile(rb'^\s*from\s+(idaapi|idc|idautils|ida_\w+)\s+import\s+\*', re.MULTILINE)
+
+# 在子行程中執行: 安裝替身 IDA 模組、載入入口檔並量測各階段
+RUNNER = r'''
+import os, sys, json, time, types, resource, importlib.abc, importlib.util
+
+MARKER = %(marker)r
+CONSTANTS = {
+    'BADADDR': 0xFFFFFFFFFFFFFFFF, 'IDA_SDK_VERSION': 900,
+    'PLUGIN_SKIP': 0, 'PLUGIN_OK': 1, 'PLUGIN_KEEP': 2,
+    'PLUGIN_MOD': 0x1, 'PLUGIN_DRAW': 0x2, 'PLUGIN_SEG': 0x4, 'PLUGIN_UNL': 0x8,
+    'PLUGIN_HIDE': 0x10, 'PLUGIN_DBG': 0x20, 'PLUGIN_PROC': 0x40, 'PLUGIN_FIX': 0x80,
+    'PLUGIN_MULTI': 0x100, 'PLUGIN_SCRIPTED': 0x8000,
+}
+FUNCTIONS = {'get_kernel_version': lambda: '9.0', 'get_idb_path': lambda: '', 'get_input_file_path': lambda: ''}
+
+class Stub(object):
+    """可任意呼叫、取屬性與運算的替身物件"""
+    def __init__(self, *args, **kwargs): pass
+    def __call__(self, *args, **kwargs): return Stub()
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return Stub()
+    def __iter__(self): return iter(())
+    def __len__(self): return 0
+    def __bool__(self): return False
+    def __int__(self): return 0
+    def __index__(self): return 0
+    def __str__(self): return ''
+    def __fspath__(self): return ''
+    def __enter__(self): return self
+    def __exit__(self, *args): return False
+    def __getitem__(self, key): return Stub()
+    def __setitem__(self, key, value): pass
+    def _binary(self, other): return 0
+    __or__ = __ror__ = __and__ = __rand__ = __add__ = __radd__ = __sub__ = __rsub__ = _binary
+    __lshift__ = __rshift__ = __mul__ = __rmul__ = __xor__ = __rxor__ = _binary
+
+class StubClass(Stub):
+    """替身基底類別，讓 plugin 可以繼承 plugin_t、UI_Hooks 等 (也用於 Functions() 這類大寫開頭的函式)"""
+    def __bool__(self): return True
+
+CLASSES = {}
+
+def stub_value(name):
+    if name in CONSTANTS:
+        return CONSTANTS[name]
+    if name in FUNCTIONS:
+        return FUNCTIONS[name]
+    if name.isupper():
+        return 0
+    if name.endswith('_t') or name.endswith('Hooks') or (name[:1].isupper() and not name.isupper()):
+        if name not in CLASSES:
+            CLASSES[name] = type(name, (StubClass,), {})
+        return CLASSES[name]
+    return Stub()
+
+class StubModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        value = stub_value(name)
+        setattr(self, name, value)
+        return value
+
+class IdaStubFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    def __init__(self, star_names):
+        self.star_names = star_names
+
+    def find_spec(self, name, path, target=None):
+        top = name.split('.')[0]
+        if top in ('idaapi', 'idc', 'idautils') or top.startswith('ida_'):
+            return importlib.util.spec_from_loader(name, self, is_package=True)
+        return None
+
+    def create_module(self, spec):
+        module = StubModule(spec.name)
+        module.__path__ = []
+        # `from idc import *` 只能匯入 __all__ 中的名稱: 使用預先從原始碼找出的自由變數
+        module.__all__ = list(self.star_names)
+        return module
+
+    def exec_module(self, module):
+        pass
+
+def main():
+    entry, names_file = sys.argv[1], sys.argv[2]
+    with open(names_file) as f:
+        star_names = json.load(f)
+
+    sys.meta_path.insert(0, IdaStubFinder(star_names))
+    sys.path.insert(0, os.path.dirname(entry))
+    sys.argv = [entry]
+    result = {'status': 'ok', 'error': '', 'import': None, 'entry': None, 'init': None}
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    sys.stderr.write(MARKER + '\n')
+    sys.stderr.flush()
+    try:
+        start = time.perf_counter()
+        spec = importlib.util.spec_from_file_location('__plugin__', entry)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules['__plugin__'] = module
+        spec.loader.exec_module(module)
+        result['import'] = time.perf_counter() - start
+
+        if not hasattr(module, 'PLUGIN_ENTRY'):
+            result['status'] = 'no_entry'
+        else:
+            start = time.perf_counter()
+            plugin = module.PLUGIN_ENTRY()
+            result['entry'] = time.perf_counter() - start
+
+            init = getattr(plugin, 'init', None)
+            if callable(init):
+                start = time.perf_counter()
+                init()
+                result['init'] = time.perf_counter() - start
+    except BaseException as e:
+        result['status'] = 'error'
+        result['error'] = '%%s: %%s' %% (type(e).__name__, e)
+
+    result['rss_before_kb'] = rss_before
+    result['peak_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    sys.stdout.write(MARKER + json.dumps(result) + '\n')
+
+main()
+''' % {'marker': MARKER}
+
+def bound_names(tree: ast.AST) -> set:
+    """收集檔案中自行定義或 import 的名稱 (這些不能被替身模組覆蓋)"""
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            names.add(node.id)
+        elif isinstance(node, ast.alias):
+            names.add((node.asname or node.name).split('.')[0])
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+    return names
+
+def star_import_names(directory: str) -> List[str]:
+    """找出 `from ida_xxx import *` 的檔案中使用到、但沒有定義的名稱"""
+    names = set()
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if not d.startswith('.') and d != '__pycache__']
+        for filename in files:
+            if not filename.endswith('.py'):
+                continue
+            try:
+                with open(os.path.join(root, filename), 'rb') as f:
+                    source = f.read()
+                if not STAR_IMPORT_RE.search(source):
+                    continue
+                tree = ast.parse(source)
+            except (OSError, SyntaxError, ValueError):
+                continue
+            used = {n.id for n in ast.walk(tree) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Load)}
+            names |= used - bound_names(tree)
+    return sorted(names - set(dir(builtins)))
+
+def parse_importtime(stderr: str) -> Dict:
+    """解析 -X importtime 輸出: 只計算入口檔開始載入後的最上層 import"""
+    if MARKER not in stderr:
+        return {'total': 0.0, 'top': []}
+
+    top_level = []
+    for line in stderr.split(MARKER, 1)[1].splitlines():
+        match = re.match(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( +)(\S.*)$', line)
+        # 最上層的 import 名稱前只有一個空白，巢狀的 import 會多縮排
+        if match and len(match.group(3)) == 1:
+            top_level.append((int(match.group(2)) / 1e6, match.group(4)))
+
+    top_level.sort(reverse=True)
+    return {
+        'total': sum(t for t, _ in top_level),
+        'top': [{'module': name, 'seconds': t} for t, name in top_level[:5]]
+    }
+
+def profile_entry(python: str, entry: str, names_file: str, timeout: int) -> Dict:
+    """在獨立子行程中載入一個入口檔"""
+    start_time = time.perf_counter()
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    try:
+        proc = subprocess.run([python, '-X', 'importtime', '-c', RUNNER, entry, names_file],
+                              cwd=os.path.dirname(entry), env=env,
+                              capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {'status': 'timeout', 'error': f'超過 {timeout} 秒', 'wall': time.perf_counter() - start_time}
+
+    result = None
+    for line in proc.stdout.splitlines():
+        if line.startswith(MARKER):
+            result = json.loads(line[len(MARKER):])
+    if result is None:
+        tail = proc.stderr.strip().splitlines()[-1:] or [f'exit {proc.returncode}']
+        result = {'status': 'crash', 'error': tail[0]}
+
+    result['imports'] = parse_importtime(proc.stderr)
+    result['wall'] = time.perf_counter() - start_time
+    return result
+
+def median_result(runs: List[Dict]) -> Dict:
+    """多次執行時取各階段的中位數"""
+    result = dict(runs[-1])
+    for key in ('import', 'entry', 'init', 'wall'):
+        values = [r[key] for r in runs if r.get(key) is not None]
+        result[key] = statistics.median(values) if values else None
+    result['imports'] = dict(runs[-1]['imports'], total=statistics.median(r['imports']['total'] for r in runs))
+    return result
+
+def deployed_entries(plugins_dir: str) -> List[Dict]:
+    """列出已部署目錄 ($IDAUSR/plugins) 中 IDA 會載入的入口檔"""
+    targets = []
+    for name in sorted(os.listdir(plugins_dir)):
+        path = os.path.join(plugins_dir, name)
+        if name.endswith('.py') and os.path.isfile(path):
+            targets.append({'name': name[:-3], 'entry': path, 'source': os.path.dirname(os.path.realpath(path))})
+        elif os.path.isfile(os.path.join(path, 'ida-plugin.json')):
+            with open(os.path.join(path, 'ida-plugin.json'), 'r', encoding='utf-8') as f:
+                entry_point = json.load(f).get('plugin', {}).get('entryPoint', '')
+            if entry_point:
+                targets.append({'name': name, 'entry': os.path.join(path, entry_point), 'source': path})
+    return targets
+
+def profile_targets(targets: List[Dict], python: str, jobs: int = 1, repeat: int = 1,
+                    timeout: int = 120) -> List[Dict]:
+    """分析所有入口並依總耗時排序"""
+    workdir = tempfile.mkdtemp(prefix='ida_profile_')
+
+    def run(target: Dict) -> Dict:
+        fd, names_file = tempfile.mkstemp(suffix='.json', dir=workdir)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(star_import_names(target['source']), f)
+
+        runs = [profile_entry(python, target['entry'], names_file, timeout) for _ in range(repeat)]
+        result = median_result(runs) if all('imports' in r for r in runs) else runs[-1]
+        result.update(name=target['name'], file=target['entry'])
+        result['total'] = sum(result.get(k) or 0 for k in ('import', 'entry', 'init'))
+        print(f"  {'✅' if result['status'] == 'ok' else '⚠️'} {target['name']} ({result['total'] * 1000:.0f} ms)")
+        return result
+
+    try:
+        # 並行會互相干擾計時，預設逐一執行
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            results = list(executor.map(run, targets))
+    finally:
+        for filename in os.listdir(workdir):
+            os.remove(os.path.join(workdir, filename))
+        os.rmdir(workdir)
+
+    results.sort(key=lambda r: r['total'], reverse=True)
+    return results
+
+def print_report(results: List[Dict]) -> None:
+    """以表格顯示排名"""
+    def ms(value: Optional[float]) -> str:
+        return '-' if value is None else f"{value * 1000:.1f}"
+
+    width = max([len(r['name']) for r in results] + [len('Plugin')])
+    print(f"{'#':>3}  {'Plugin':<{width}}  {'Total':>8}  {'Import':>8}  {'Deps':>8}  {'Entry':>7}  {'Init':>7}  {'RSS MB':>7}  狀態")
+    print('-' * (width + 76))
+    for rank, r in enumerate(results, 1):
+        rss = (r.get('peak_rss_kb') or 0) / 1024
+        status = r['status'] + (f" ({r['error']})" if r.get('error') else '')
+        print(f"{rank:>3}  {r['name']:<{width}}  {ms(r['total']):>8}  {ms(r.get('import')):>8}  "
+              f"{ms(r.get('imports', {}).get('total')):>8}  {ms(r.get('entry')):>7}  {ms(r.get('init')):>7}  "
+              f"{rss:>7.1f}  {status}")
+
+    total = sum(r['total'] for r in results)
+    print(f"\n⏱️  所有 plugin 合計: {total * 1000:.0f} ms")
+    heaviest = [(m['seconds'], m['module'], r['name']) for r in results for m in r.get('imports', {}).get('top', [])]
+    if heaviest:
+        print("🐢 最慢的依賴 import:")
+        for seconds, module, name in sorted(heaviest, reverse=True)[:10]:
+            print(f"  • {module} ({name}): {seconds * 1000:.1f} ms")
+
+def find_regressions(results: List[Dict], baseline_file: str, threshold: float, min_ms: float) -> List[Dict]:
+    """與先前的報告比較，找出載入時間變慢超過門檻、或狀態變差 (新的錯誤、逾時、crash) 的 plugin"""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = {r['name']: r for r in json.load(f)['plugins']}
+
+    regressions = []
+    for r in results:
+        old = baseline.get(r['name'], {'status': 'ok', 'error': ''})
+        if r['status'] != 'ok' and (r['status'] != old['status'] or r.get('error') != old.get('error')):
+            regressions.append({'name': r['name'], 'reason': 'status',
+                                'before': old['status'], 'after': r['status'], 'error': r.get('error', '')})
+            continue
+        if r['name'] not in baseline:
+            continue
+        delta = r['total'] - old['total']
+        if delta * 1000 >= min_ms and delta > old['total'] * threshold / 100:
+            regressions.append({'name': r['name'], 'reason': 'slower', 'before': old['total'], 'after': r['total']})
+    return regressions
+
+def main():
+    """主函數"""
+    args = sys.argv[1:]
+
+    def option(name: str, default=None):
+        if name in args:
+            index = args.index(name)
+            value = args[index + 1]
+            del args[index:index + 2]
+            return value
+        return default
+
+    python = option('--python', sys.executable)
+    jobs = int(option('--jobs', '1'))
+    repeat = max(1, int(option('--repeat', '1')))
+    timeout = int(option('--timeout', '120'))
+    deployed = option('--deployed')
+    output = option('--output', 'plugin_profile.json')
+    baseline = option('--baseline')
+    threshold = float(option('--threshold', '20'))
+    min_ms = float(option('--min-ms', '5'))
+    names = option('--plugins')
+    names = names.split(',') if names else None
+
+    if deployed:
+        targets = deployed_entries(deployed)
+    else:
+        targets = [{'name': p['name'] if len(p['entries']) == 1 else f"{p['name']}/{os.path.basename(e)}",
+                    'entry': e, 'source': p['path']}
+                   for p in discover_plugins(PLUGINS_DIR, names) for e in p['entries']]
+
+    if not targets:
+        print("📭 沒有找到任何 plugin 入口")
+        return
+
+    print(f"🔬 分析 {len(targets)} 個 plugin 入口 (Python {python}, 重複 {repeat} 次)...")
+    results = profile_targets(targets, python, jobs, repeat, timeout)
+    print()
+    print_report(results)
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'timestamp': datetime.now().isoformat(), 'python': python, 'plugins': results},
+                  f, ensure_ascii=False, indent=2)
+    print(f"📄 報告已保存到: {output}")
+
+    if baseline:
+        regressions = find_regressions(results, baseline, threshold, min_ms)
+        if regressions:
+            print(f"\n❌ {len(regressions)} 個 plugin 載入變慢超過 {threshold:.0f}% 或狀態變差:")
+            for r in regressions:
+                if r['reason'] == 'status':
+                    print(f"  • {r['name']}: {r['before']} → {r['after']} ({r['error']})")
+                else:
+                    print(f"  • {r['name']}: {r['before'] * 1000:.1f} ms → {r['after'] * 1000:.1f} ms")
+            sys.exit(1)
+        print("✅ 沒有載入時間或狀態退步")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in ['-h', '--help']:
+        print("用法: python3 profile_plugins.py [選項]")
+        print("")
+        print("選項:")
+        print("  --plugins a,b      只分析指定的 plugin (plugins/ 下的目錄名稱)")
+        print("  --deployed DIR     分析已部署的目錄 (例如 $IDAUSR/plugins) 而不是 plugins/")
+        print("  --python PATH      執行 plugin 的 Python 直譯器 (預設為目前的 python3)")
+        print("  --repeat N         每個 plugin 執行 N 次取中位數 (預設 1)")
+        print("  --jobs N           並行數 (預設 1，並行會影響計時)")
+        print("  --timeout SEC      單一 plugin 的逾時秒數 (預設 120)")
+        print("  --output FILE      報告檔 (預設 plugin_profile.json)")
+        print("  --baseline FILE    與先前的報告比較，變慢或狀態變差 (錯誤、逾時、crash) 時以非 0 結束")
+        print("  --threshold PCT    退步門檻百分比 (預設 20)")
+        print("  --min-ms MS        忽略小於此毫秒數的差異 (預設 5)")
+        print("  -h, --help         顯示此說明")
+        print("")
+        print("範例:")
+        print("  python3 profile_plugins.py --repeat 3")
+        print("  python3 profile_plugins.py --baseline plugin_profile.old.json --threshold 20")
+        sys.exit(0)
+
+    main()
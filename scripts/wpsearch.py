@@ -1,68 +1,568 @@
-import idc
-import idaapi
-import idautils
+import os
+import math
+import json
+import zlib
+import struct
+import threading
+from array import array
+
+try:
+    import idc
+    import idaapi
+    import idautils
+    from idaapi import Choose2, IDB_Hooks, IDP_Hooks
+except ImportError:
+    # Imported outside of IDA (e.g. by wpsearch_headless.py) for the constant tables only
+    idc = idaapi = idautils = None
+    Choose2 = IDB_Hooks = IDP_Hooks = object
+
+def immediate_index(targets):
+    '''
+    Returns the immediate index for the current IDB. IDAPython runs scripts in
+    the __main__ namespace, so the index (and its hooks) from a previous run of
+    this script is reused as long as it is for the same IDB and constants.
+    '''
+    global _immediate_index
+
+    index = globals().get('_immediate_index')
+    if index is not None and (index.idb != idc.GetIdbPath() or index.targets != targets):
+        index.close()
+        index = None
+    if index is None:
+        index = ImmediateIndex(targets)
+
+    _immediate_index = index
+    return index
+
+def close_immediate_index():
+    '''
+    Closes and forgets the immediate index when its database is closed. A
+    database opened later (even the same IDB, unsaved) starts over from the
+    netnode and validates every entry.
+    '''
+    index = globals().pop('_immediate_index', None)
+    if index is not None:
+        index.close()
+
+class ImmediateIndex(object):
+    '''
+    Per-function index of the interesting immediates, stored in a netnode so it
+    persists in the IDB. Entries are keyed by function start and carry a CRC32
+    of the function's chunks; the first query of a session rescans only the
+    functions whose checksum changed, and after that the IDB hooks mark the
+    functions that were created, changed or deleted.
+    '''
+
+    NETNODE = '$ wpsearch immediate index'
+    ENTRY_TAG = 'S'
+    HEADER_TAG = 'H'
+    VERSION = 1
+
+    def __init__(self, targets):
+        self.targets = targets
+        self.idb = idc.GetIdbPath()
+        self.entries = {}
+        self.dirty = set()
+        self.validated = False
+
+        self._load()
+        self.hooks = ImmediateIndexHooks(self)
+        self.hooks.hook()
+        self.close_hooks = ImmediateIndexCloseHooks()
+        self.close_hooks.hook()
+
+    def close(self):
+        self.hooks.unhook()
+        self.close_hooks.unhook()
+        self.node = None
+
+    def query(self):
+        '''
+        Brings the index up to date.
+
+        Returns a dictionary of function EAs and the constants found in them.
+        '''
+        for progress in self.refresh():
+            pass
+        return self.results()
+
+    def refresh(self, batch_size=256):
+        '''
+        Generator that brings the index up to date, checking batch_size
+        functions per step and yielding (checked, total to check). The first
+        refresh of a session checks the checksum of every function; after that
+        only the functions marked by the hooks are rescanned.
+        '''
+        functions = set(idautils.Functions())
+
+        for ea in list(self.entries.keys()):
+            if ea not in functions:
+                self._remove(ea)
+
+        validate = not self.validated
+        if validate:
+            pending = sorted(functions)
+        else:
+            pending = sorted((self.dirty & functions) | (functions - set(self.entries.keys())))
+
+        for i in range(0, len(pending), batch_size):
+            for ea in pending[i:i + batch_size]:
+                checksum = self._checksum(ea)
+                if validate and ea in self.entries and self.entries[ea][0] == checksum:
+                    continue
+                self._update(ea, checksum)
+            yield (min(i + batch_size, len(pending)), len(pending))
+
+        self.dirty.clear()
+        self.validated = True
+
+    def results(self):
+        return dict((ea, constants) for (ea, (checksum, constants)) in self.entries.items() if constants)
+
+    def invalidate(self, ea):
+        func = idaapi.get_func(ea)
+        if func:
+            self.dirty.add(func.startEA)
+
+    def _load(self):
+        header = struct.pack('<II', self.VERSION, zlib.crc32(self._pack(sorted(set(self.targets.values())))) & 0xFFFFFFFF)
+
+        self.node = idaapi.netnode(self.NETNODE, 0, True)
+        if self.node.supval(0, self.HEADER_TAG) != header:
+            # Different constants (or an older format): start over
+            self.node.kill()
+            self.node = idaapi.netnode(self.NETNODE, 0, True)
+            self.node.supset(0, header, self.HEADER_TAG)
+            return
+
+        ea = self.node.sup1st(self.ENTRY_TAG)
+        while ea != idaapi.BADNODE:
+            value = self.node.supval(ea, self.ENTRY_TAG)
+            fields = struct.unpack('<%dI' % (len(value) // 4), value)
+            self.entries[ea] = (fields[0], fields[1:])
+            ea = self.node.supnxt(ea, self.ENTRY_TAG)
+
+    def _update(self, func_ea, checksum):
+        entry = (checksum, self._scan(func_ea))
+        self.entries[func_ea] = entry
+        self.node.supset(func_ea, self._pack((entry[0],) + entry[1]), self.ENTRY_TAG)
+
+    def _remove(self, func_ea):
+        del self.entries[func_ea]
+        self.node.supdel(func_ea, self.ENTRY_TAG)
+
+    def _scan(self, func_ea):
+        found = set()
+        for ea in idautils.FuncItems(func_ea):
+            for n in range(idaapi.UA_MAXOP):
+                op_type = idc.GetOpType(ea, n)
+                if op_type <= idc.o_void:
+                    break
+                if op_type == idc.o_imm:
+                    immediate = self.targets.get(idc.GetOperandValue(ea, n))
+                    if immediate is not None:
+                        found.add(immediate)
+        return tuple(sorted(found))
+
+    def _checksum(self, func_ea):
+        crc = 0
+        for (start, end) in idautils.Chunks(func_ea):
+            crc = zlib.crc32(struct.pack('<QQ', start, end), crc)
+            crc = zlib.crc32(idc.GetManyBytes(start, end - start) or b'', crc)
+        return crc & 0xFFFFFFFF
+
+    def _pack(self, values):
+        return struct.pack('<%dI' % len(values), *values)
+
+class ImmediateIndexHooks(IDB_Hooks):
+    '''
+    Marks functions for rescanning when they are created, changed or deleted.
+    '''
+
+    def __init__(self, index):
+        IDB_Hooks.__init__(self)
+        self.index = index
+
+    def func_added(self, pfn):
+        self.index.invalidate(pfn.startEA)
+        return 0
+
+    def func_updated(self, pfn):
+        self.index.invalidate(pfn.startEA)
+        return 0
+
+    def deleting_func(self, pfn):
+        self.index.invalidate(pfn.startEA)
+        return 0
+
+    def set_func_start(self, pfn, new_start):
+        self.index.invalidate(pfn.startEA)
+        return 0
+
+    def set_func_end(self, pfn, new_end):
+        self.index.invalidate(pfn.startEA)
+        return 0
+
+    def func_tail_appended(self, pfn, tail):
+        self.index.invalidate(pfn.startEA)
+        return 0
+
+    def func_tail_removed(self, pfn, tail_ea):
+        self.index.invalidate(pfn.startEA)
+        return 0
+
+    def byte_patched(self, ea, *args):
+        self.index.invalidate(ea)
+        return 0
+
+class ImmediateIndexCloseHooks(IDP_Hooks):
+    '''
+    Drops the immediate index (and its IDB hooks) when the database is closed.
+    '''
+
+    def closebase(self):
+        close_immediate_index()
+        return 0
+
+class Signature(object):
+    '''
+    A named set of constants. A function matches when it contains at least
+    `threshold` (a fraction) of them, which tolerates compiler optimised
+    variants that fold or drop some of the constants.
+    '''
+
+    def __init__(self, name, constants, threshold=0.7, description=''):
+        if not 0 < threshold <= 1:
+            raise ValueError('Signature %r: threshold must be in (0, 1], got %r' % (name, threshold))
+        if not constants:
+            raise ValueError('Signature %r has no constants' % name)
+
+        self.name = name
+        self.constants = tuple(sorted(set(constants)))
+        self.threshold = threshold
+        self.description = description
+        self.required = max(1, int(math.ceil(threshold * len(self.constants) - 1e-9)))
+
+    def __repr__(self):
+        return 'Signature(%r, %d constants, threshold=%.2f)' % (self.name, len(self.constants), self.threshold)
+
+def load_signatures(path):
+    '''
+    Loads signatures from a JSON file containing a list of objects with a name,
+    a list of constants (integers or "0x..." strings), and optionally a
+    threshold and description. An entry with only a name selects the built-in
+    signature of that name from SIGNATURES.
+    '''
+    with open(path, 'r') as fp:
+        data = json.load(fp)
+
+    builtin = dict((signature.name.lower(), signature) for signature in SIGNATURES)
+    signatures = []
+    for entry in data:
+        if 'constants' not in entry:
+            if entry['name'].lower() not in builtin:
+                raise ValueError('%s: unknown built-in signature %r (available: %s)' % (
+                    path, entry['name'], ', '.join(signature.name for signature in SIGNATURES)))
+            signatures.append(builtin[entry['name'].lower()])
+            continue
+        constants = [int(c, 0) if hasattr(c, 'strip') else int(c) for c in entry['constants']]
+        signatures.append(Signature(entry['name'], constants,
+                                    entry.get('threshold', 0.7), entry.get('description', '')))
+    return signatures
+
+class CallGraph(object):
+    '''
+    Caller/callee adjacency of every function, in compressed sparse row form:
+    the callers of function i are caller_ids[caller_offsets[i]:caller_offsets[i + 1]]
+    (indexes into functions), and likewise for callees. Built once per scan with
+    one XrefsTo() walk per function; breadth-first searches are memoized.
+    '''
+
+    def __init__(self, build=True):
+        self.functions = sorted(idautils.Functions())
+        self.ids = dict((ea, i) for (i, ea) in enumerate(self.functions))
+        self.memo = {}
+
+        if build:
+            for progress in self.build():
+                pass
+
+    def build(self, batch_size=1024):
+        '''
+        Generator that fills in the adjacency, yielding (functions done, total)
+        after every batch_size functions.
+        '''
+        self.caller_offsets = array('i', [0])
+        self.caller_ids = array('i')
+        for (n, ea) in enumerate(self.functions):
+            callers = set()
+            for xref in idautils.XrefsTo(ea):
+                func = idaapi.get_func(xref.frm)
+                if func and func.startEA != ea and func.startEA in self.ids:
+                    callers.add(self.ids[func.startEA])
+            self.caller_ids.extend(sorted(callers))
+            self.caller_offsets.append(len(self.caller_ids))
+
+            if (n + 1) % batch_size == 0:
+                yield (n + 1, len(self.functions))
+
+        # Callees are the transpose of callers
+        counts = [0] * (len(self.functions) + 1)
+        for caller in self.caller_ids:
+            counts[caller + 1] += 1
+        for i in range(len(self.functions)):
+            counts[i + 1] += counts[i]
+        self.callee_offsets = array('i', counts)
+        self.callee_ids = array('i', [0] * len(self.caller_ids))
+        fill = list(counts)
+        for callee in range(len(self.functions)):
+            for k in range(self.caller_offsets[callee], self.caller_offsets[callee + 1]):
+                caller = self.caller_ids[k]
+                self.callee_ids[fill[caller]] = callee
+                fill[caller] += 1
+
+        yield (len(self.functions), len(self.functions))
+
+    def callers_of(self, ea):
+        return self._neighbours(ea, self.caller_offsets, self.caller_ids)
+
+    def callees_of(self, ea):
+        return self._neighbours(ea, self.callee_offsets, self.callee_ids)
+
+    def callers(self, roots, depth):
+        '''
+        Breadth-first search up the call graph from roots.
+
+        Returns a dictionary of function EAs and their distance in call levels
+        from the nearest root (roots are level 0), up to depth levels.
+        '''
+        key = frozenset(self.ids[ea] for ea in roots if ea in self.ids)
+        if key in self.memo and self.memo[key][0] >= depth:
+            levels = self.memo[key][1]
+        else:
+            levels = self._bfs(key, depth, self.caller_offsets, self.caller_ids)
+            self.memo[key] = (depth, levels)
+
+        return dict((self.functions[i], level) for (i, level) in levels.items() if level <= depth)
+
+    def _bfs(self, roots, depth, offsets, ids):
+        levels = dict((i, 0) for i in roots)
+        frontier = sorted(roots)
+        for level in range(1, depth + 1):
+            next_frontier = []
+            for i in frontier:
+                for k in range(offsets[i], offsets[i + 1]):
+                    j = ids[k]
+                    if j not in levels:
+                        levels[j] = level
+                        next_frontier.append(j)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        return levels
+
+    def _neighbours(self, ea, offsets, ids):
+        i = self.ids.get(ea)
+        if i is None:
+            return []
+        return [self.functions[ids[k]] for k in range(offsets[i], offsets[i + 1])]
 
 class WPSearch(object):
     '''
     Searches for immediate values commonly founds in MIPS WPS checksum implementations.
     May be applicable to other architectures as well.
-    '''
 
-    IMMEDIATES = {
-                        0x6B5FCA6B : set(),
-                        0x431BDE83 : set(),
-                        0x0A7C5AC5 : set(),
-                        0x10624DD3 : set(),
-                        0x51EB851F : set(),
-                        0xCCCCCCCD : set(),
-                        0xD1B71759 : set(),
-                 }
+    Other constant signatures (CRCs, hash IVs, ...) can be opted into and are
+    searched for in the same pass; all of their constants are compiled into a
+    single lookup table.
+    '''
 
-    def __init__(self):
+    IMMEDIATES = (
+                        0x6B5FCA6B,
+                        0x431BDE83,
+                        0x0A7C5AC5,
+                        0x10624DD3,
+                        0x51EB851F,
+                        0xCCCCCCCD,
+                        0xD1B71759,
+                 )
+
+    def __init__(self, signatures=None, depth=1):
+        self.signatures = tuple(signatures or (WPS_PIN_CHECKSUM,))
+        self.depth = depth
+        self.lookup = {}
+        for signature in self.signatures:
+            for constant in signature.constants:
+                self.lookup.setdefault(constant, []).append(signature)
+
+        self.immediates = {}
+        self.scores = {}
         self.cksums = set()
+        self.funcs = {}
+        self.levels = {}
+        self.call_graph = None
+        self.resolved = {}
+        self.strings = {}
+        self.string_index = None
 
     def checksums(self):
         '''
-        Search for WPS checksum functions.
+        Search for functions matching any of the signatures.
 
         Returns a set of function EAs.
         '''
+        self.scores = self.match()
+        self.cksums = set(self.scores.keys())
+        return self.cksums
+
+    def match(self):
+        '''
+        Scores every function by the fraction of each signature's constants it contains.
+
+        Returns a dictionary of function EAs and the {signature name: score}
+        of the signatures whose threshold they meet.
+        '''
         self._search_for_immediates()
+        return self._score()
 
-        self.cksums = self.IMMEDIATES.values()[0]
-        for i in range(1, len(self.IMMEDIATES.values())):
-            self.cksums = self.cksums & self.IMMEDIATES.values()[i]
+    def scan(self, batch_size=256, rebuild=True):
+        '''
+        Incremental equivalent of checksums() followed by xrefs(). Each step of
+        the generator does a bounded amount of work and yields one of:
 
-        return self.cksums
+            ('progress', what, done, total)     while the immediate index and the call graph are updated
+            ('function', func_ea, strings)      for each function xrefs() would return
 
-    def xrefs(self):
+        With rebuild=False the checksum functions and call graph of the previous
+        scan are reused (e.g. when only self.depth changed), provided that scan
+        got as far as completing the call graph.
         '''
-        Identify functions that reference the WPS checksum functions and resolve their string xrefs.
+        if rebuild or self.call_graph is None:
+            self.call_graph = None
+            index = immediate_index(self._immediate_table())
+            for (done, total) in index.refresh(batch_size):
+                yield ('progress', 'functions checked against the index', done, total)
+
+            self._collect_immediates(index.results())
+            self.scores = self._score()
+            self.cksums = set(self.scores.keys())
+
+            # Only kept once complete, so a cancelled build is not reused
+            call_graph = CallGraph(build=False)
+            for (done, total) in call_graph.build(batch_size * 4):
+                yield ('progress', 'functions added to the call graph', done, total)
+            self.call_graph = call_graph
+            self.resolved = {}
+
+        self._generate_checksum_xrefs_table()
+        for func_ea in sorted(self.funcs.keys(), key=lambda ea: (self.levels[ea], ea)):
+            self._resolve_strings(func_ea)
+            yield ('function', func_ea, self.funcs[func_ea])
+
+    def _score(self):
+        hits = {}
+        for (constant, funcs) in self.immediates.items():
+            for func_ea in funcs:
+                counts = hits.setdefault(func_ea, {})
+                for signature in self.lookup[constant]:
+                    counts[signature] = counts.get(signature, 0) + 1
+
+        matches = {}
+        for (func_ea, counts) in hits.items():
+            for (signature, count) in counts.items():
+                if count >= signature.required:
+                    matches.setdefault(func_ea, {})[signature.name] = count / float(len(signature.constants))
+        return matches
+
+    def xrefs(self, depth=None):
+        '''
+        Identify functions that reference the WPS checksum functions, up to depth
+        call levels above them (self.depth by default), and resolve their string xrefs.
 
         Returns a dictionary of function EAs and a list of their string xrefs.
+        The call level of each function is in self.levels.
         '''
+        if not self.cksums:
+            self.checksums()
+
+        if depth is not None:
+            self.depth = depth
         self._generate_checksum_xrefs_table()
 
-        for string in idautils.Strings():
-            for xref in idautils.XrefsTo(string.ea):
-                func = idaapi.get_func(xref.frm)
-                if func and self.funcs.has_key(func.startEA):
-                    self.funcs[func.startEA].add(str(string))
+        for func_ea in self.funcs.keys():
+            self._resolve_strings(func_ea)
 
         return self.funcs
 
+    def _resolve_strings(self, func_ea):
+        '''
+        Fills in self.funcs[func_ea]. Functions already resolved since the call
+        graph was built (e.g. at another depth) are not walked again.
+        '''
+        if func_ea not in self.resolved:
+            strings = set()
+            for ea in idautils.FuncItems(func_ea):
+                for ref in idautils.DataRefsFrom(ea):
+                    string = self._string_at(ref)
+                    if string is not None:
+                        strings.add(string)
+            self.resolved[func_ea] = strings
+        self.funcs[func_ea] = set(self.resolved[func_ea])
+
+    def _string_at(self, ea):
+        '''
+        Returns the string literal at ea, or None. Results are cached by address.
+        '''
+        if ea in self.strings:
+            return self.strings[ea]
+
+        string = None
+        flags = idc.GetFlags(ea)
+        if idc.isASCII(flags):
+            string = idc.GetString(ea, -1, idc.GetStringType(ea))
+        elif idc.isUnknown(flags):
+            # Not defined as a string item; fall back to the strings list, which is
+            # only indexed (once, by address) the first time this happens.
+            if self.string_index is None:
+                self.string_index = dict((s.ea, str(s)) for s in idautils.Strings())
+            string = self.string_index.get(ea)
+
+        self.strings[ea] = string
+        return string
+
     def _search_for_immediates(self):
-        for immediate in self.IMMEDIATES.keys():
-            ea = 0
-            while ea != idc.BADADDR:
-                (ea, n) = idc.FindImmediate(ea, idc.SEARCH_DOWN, self._twos_compliment(immediate))
-                if ea != idc.BADADDR:
-                    func = idaapi.get_func(ea)
-                    if func:
-                        self.IMMEDIATES[immediate].add(func.startEA)
+        '''
+        Looks up the functions containing each constant in the per-function
+        immediate index, which only rescans functions that changed since the
+        last query. Each scan is a single pass over the function's code heads,
+        matching every immediate operand against all of the constants at once.
+        '''
+        self.call_graph = None
+        self._collect_immediates(immediate_index(self._immediate_table()).query())
+
+    def _collect_immediates(self, functions):
+        self.immediates = dict((constant, set()) for constant in self.lookup.keys())
+
+        for (func_ea, constants) in functions.items():
+            for immediate in constants:
+                self.immediates[immediate].add(func_ea)
+
+    def _immediate_table(self):
+        '''
+        Maps every form an operand value may take (as stored, two's compliment,
+        and sign extended to 64 bits) back to the signature constant.
+        '''
+        table = {}
+        for immediate in self.lookup.keys():
+            for value in (immediate,
+                          self._twos_compliment(immediate),
+                          self.__twos_compliment(immediate, 32),
+                          self.__twos_compliment(immediate, 32) & 0xFFFFFFFFFFFFFFFF):
+                table[value] = immediate
+        return table
 
     def _twos_compliment(self, val):
-        if idaapi.BADADDR == 0xFFFFFFFFFFFFFFFFL:
+        if idaapi.BADADDR == 0xFFFFFFFFFFFFFFFF:
             tv = self.__twos_compliment(val, 64)
         else:
             tv = self.__twos_compliment(val, 32)
@@ -79,84 +579,200 @@ class WPSearch(object):
         return val
 
     def _generate_checksum_xrefs_table(self):
-        self.funcs = {}
-
-        if not self.cksums:
-            self.checksums()
-
-        for cksum in self.cksums:
-            func = idaapi.get_func(cksum)
-            if func:
-                self.funcs[func.startEA] = set()
-
-            for xref in idautils.XrefsTo(cksum):
-                func = idaapi.get_func(xref.frm)
-                if func and not self.funcs.has_key(func.startEA):
-                    self.funcs[func.startEA] = set()
-
-class WPSearchFunctionChooser(idaapi.Choose2):
+        # The call graph is built once per scan and reused for other depths
+        if self.call_graph is None:
+            self.call_graph = CallGraph()
+            self.resolved = {}
+
+        self.levels = self.call_graph.callers(self.cksums, self.depth)
+        self.funcs = dict((func_ea, set()) for func_ea in self.levels.keys())
+
+WPS_PIN_CHECKSUM = Signature('WPS PIN checksum', WPSearch.IMMEDIATES, 0.7,
+                             'Divisions by powers of 10 in the WPS PIN checksum digit loop')
+
+SIGNATURES = (
+    WPS_PIN_CHECKSUM,
+    Signature('CRC32', [0xEDB88320, 0x04C11DB7, 0x82F63B78, 0x1EDC6F41], 0.25,
+              'CRC32 / CRC32C polynomials, normal and reflected'),
+    Signature('MD5/SHA-1 IV', [0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476], 1.0,
+              'MD4, MD5 and SHA-1 initial state'),
+    Signature('MD5', [0xD76AA478, 0xE8C7B756, 0x242070DB, 0xC1BDCEEE,
+                      0xF57C0FAF, 0x4787C62A, 0xA8304613, 0xFD469501], 0.5,
+              'MD5 round constants'),
+    Signature('SHA-1', [0x5A827999, 0x6ED9EBA1, 0x8F1BBCDC, 0xCA62C1D6, 0xC3D2E1F0], 0.6,
+              'SHA-1 round constants and fifth IV word'),
+    Signature('SHA-256 IV', [0x6A09E667, 0xBB67AE85, 0x3C6EF372, 0xA54FF53A,
+                             0x510E527F, 0x9B05688C, 0x1F83D9AB, 0x5BE0CD19], 0.75,
+              'SHA-256 initial state'),
+)
+
+class WPSearchFunctionChooser(Choose2):
+    '''
+    Opens immediately and fills in as the scan finds functions. The scan runs
+    in a worker thread that advances WPSearch.scan() one step at a time through
+    execute_sync, so all IDA API calls still happen on the main thread.
+    '''
 
     DELIM_COL_1 = '-' * 50
     DELIM_COL_2 = '-' * 20
     DELIM_COL_3 = '-' * 125
+    DELIM_COL_4 = '-' * 5
 
-    def __init__(self):
+    BATCH_SIZE = 256
+
+    def __init__(self, signatures=None, depth=1):
         idaapi.Choose2.__init__(self,
                                 "WPS Function Profiles",
                                 [
                                     ["Function", 15 | idaapi.Choose2.CHCOL_PLAIN],
-                                    ["Contains checksum algorithm", 15 | idaapi.Choose2.CHCOL_PLAIN],
+                                    ["Contains checksum algorithm", 25 | idaapi.Choose2.CHCOL_PLAIN],
                                     ["String(s)", 75 | idaapi.Choose2.CHCOL_PLAIN],
+                                    ["Level", 5 | idaapi.Choose2.CHCOL_DEC],
                                 ])
 
         self.icon = 41
-        self.wps = WPSearch()
+        self.wps = WPSearch(signatures, depth)
 
-        self.run_scans()
-        self.populate_items()
+        # (func_ea, string) per row, None for delimiters; formatted in OnGetLine
+        self.items = []
+        self.names = {}
+        self.cancelled = threading.Event()
+        self.running = False
+        self.closed = False
+        self.cmd_cancel = None
+        self.cmd_depth = None
+        self.progress = None
 
     def OnSelectLine(self, n):
-        idc.Jump(self.items[n][-1])
+        if self.items[n] is not None:
+            idc.Jump(self.items[n][0])
 
     def OnGetSize(self):
         return len(self.items)
 
     def OnGetLine(self, n):
-        return self.items[n]
+        row = self.items[n]
+        if row is None:
+            return [self.DELIM_COL_1, self.DELIM_COL_2, self.DELIM_COL_3, self.DELIM_COL_4]
+
+        (func_ea, string) = row
+        return [self.name(func_ea), self.describe_match(func_ea), string, str(self.wps.levels.get(func_ea, ''))]
+
+    def OnCommand(self, n, cmd_id):
+        if cmd_id == self.cmd_cancel:
+            self.cancel()
+        elif cmd_id == self.cmd_depth:
+            depth = idc.AskLong(self.wps.depth, "Caller levels above the checksum functions")
+            if depth is not None and depth >= 0 and depth != self.wps.depth:
+                self.cancel()
+                self.wps.depth = depth
+                self.start(rebuild=False)
+        return 1
 
     def OnClose(self):
-        pass
-
-    def run_scans(self):
-        self.checksum_functions = self.wps.checksums()
-        self.checksum_string_xrefs = self.wps.xrefs()
-
-    def populate_items(self):
+        self.closed = True
+        self.cancel()
+
+    def name(self, func_ea):
+        if func_ea not in self.names:
+            self.names[func_ea] = idc.Name(func_ea)
+        return self.names[func_ea]
+
+    def describe_match(self, func_ea):
+        scores = self.wps.scores.get(func_ea, {})
+        return ', '.join('%s (%d%%)' % (name, score * 100) for (name, score) in sorted(scores.items()))
+
+    def cancel(self):
+        if self.running and not self.cancelled.is_set():
+            self.cancelled.set()
+            self.running = False
+            idaapi.msg("WPSearch: scan cancelled\n")
+
+    def add_function(self, func_ea, strings):
+        if self.items:
+            self.items.append(None)
+        self.items.extend((func_ea, string) for string in (sorted(strings) or [""]))
+        if not self.closed:
+            self.Refresh()
+
+    def report_progress(self, what, done, total):
+        percent = done * 100 // total if total else 100
+        if (what, percent // 10) != self.progress:
+            self.progress = (what, percent // 10)
+            idaapi.msg("WPSearch: %d/%d %s\n" % (done, total, what))
+
+    def start(self, rebuild=True):
+        # Functions may have been renamed since the last scan
         self.items = []
-
-        for (func_ea, strings) in self.checksum_string_xrefs.iteritems():
-
-            is_checksum_function = str(func_ea in self.checksum_functions)
-
-            if not strings:
-                self.items.append([idc.Name(func_ea), is_checksum_function, "", func_ea])
+        self.names = {}
+        self.progress = None
+        self.cancelled = threading.Event()
+        self.running = True
+        if not self.closed:
+            self.Refresh()
+
+        worker = threading.Thread(target=self.scan, args=(self.cancelled, rebuild), name='WPSearch')
+        worker.daemon = True
+        worker.start()
+
+    def scan(self, cancelled, rebuild=True):
+        '''
+        Worker thread: runs one step of the scan per execute_sync request.
+        A step already queued when the scan is cancelled does nothing.
+        '''
+        steps = self.wps.scan(self.BATCH_SIZE, rebuild)
+        state = {'done': False}
+
+        def step():
+            if cancelled.is_set():
+                return 1
+            try:
+                event = next(steps)
+            except StopIteration:
+                state['done'] = True
+                return 1
+            except Exception as e:
+                idaapi.msg("WPSearch: scan failed: %s\n" % e)
+                state['done'] = True
+                return 0
+
+            if event[0] == 'progress':
+                self.report_progress(event[1], event[2], event[3])
             else:
-                for string in strings:
-                    self.items.append([idc.Name(func_ea), is_checksum_function, string, func_ea])
+                self.add_function(event[1], event[2])
+            return 1
+
+        while not state['done'] and not cancelled.is_set():
+            idaapi.execute_sync(step, idaapi.MFF_WRITE)
 
-            self.items.append([self.DELIM_COL_1, self.DELIM_COL_2, self.DELIM_COL_3, idc.BADADDR])
+        def finish():
+            steps.close()
+            if not cancelled.is_set():
+                self.running = False
+                idaapi.msg("WPSearch: found %d checksum functions, %d functions within %d caller levels\n"
+                           % (len(self.wps.cksums), len(self.wps.funcs), self.wps.depth))
+            return 1
 
-        # Remove the last delimiter column
-        if self.items and self.items[-1][-1] == idc.BADADDR:
-            self.items.pop(-1)
+        idaapi.execute_sync(finish, idaapi.MFF_WRITE)
 
     def show(self):
         if self.Show(modal=False) < 0:
             return False
+
+        self.cmd_cancel = self.AddCommand("Cancel scan")
+        self.cmd_depth = self.AddCommand("Caller depth...")
+        self.start()
         return True
 
 
 
 if __name__ == '__main__':
-    WPSearchFunctionChooser().show()
+    # Only the WPS checksum by default; other signatures are opted into from a
+    # JSON file next to this script
+    signatures = [WPS_PIN_CHECKSUM]
+    signatures_file = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'wpsearch_signatures.json')
+    if os.path.exists(signatures_file):
+        signatures.extend(s for s in load_signatures(signatures_file) if s is not WPS_PIN_CHECKSUM)
+
+    WPSearchFunctionChooser(signatures).show()
 
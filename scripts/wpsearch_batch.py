@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+'''
+Batch WPS checksum triage over a corpus of firmware images.
+
+Fans wpsearch_headless.py out over every file under the given paths with a
+process pool and streams one JSON line per image (with timing) to the output.
+Results are cached per file content hash, and a (path, size, mtime) memo avoids
+re-hashing unchanged files, so re-running over a corpus only scans new images.
+'''
+import os
+import sys
+import json
+import time
+import struct
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+import wpsearch_headless
+from wpsearch_headless import WPSHeadlessScanner, DEFAULT_WINDOW
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'ida-plugins', 'wpsearch')
+STAT_MEMO = 'stat.json'
+# Bump when the scan output changes so older cached results are ignored
+CACHE_VERSION = 2
+SKIP_DIRS = {'.git', '__pycache__'}
+
+
+def find_images(paths, min_size):
+    '''
+    Yields every regular file under paths that is at least min_size bytes.
+    '''
+    for path in paths:
+        if os.path.isfile(path):
+            candidates = [path]
+        else:
+            candidates = []
+            for current, dirs, files in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+                candidates.extend(os.path.join(current, f) for f in sorted(files))
+
+        for candidate in candidates:
+            try:
+                st = os.stat(candidate)
+            except OSError:
+                continue
+            if os.path.isfile(candidate) and st.st_size >= min_size:
+                yield os.path.abspath(candidate), st
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for block in iter(lambda: fp.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(window):
+    '''
+    Scan parameters that the cached results depend on.
+    '''
+    signature = wpsearch_headless.WPS_PIN_CHECKSUM
+    params = json.dumps([CACHE_VERSION, window, signature.constants, signature.required])
+    return hashlib.sha256(params.encode()).hexdigest()[:12]
+
+
+def cache_path(cache_dir, content_hash, key):
+    return os.path.join(cache_dir, 'results', content_hash[:2], '%s-%s.json' % (content_hash, key))
+
+
+def load_cached(cache_dir, content_hash, key):
+    try:
+        with open(cache_path(cache_dir, content_hash, key), 'r') as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+
+def save_json(path, data):
+    '''
+    Writes data atomically (workers may race on identical images).
+    '''
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'w') as fp:
+        json.dump(data, fp)
+    os.replace(tmp, path)
+
+
+def scan_image(path, window, cache_dir, key, content_hash=None, rescan=False):
+    '''
+    Worker: hashes the image (unless the hash is known), then returns the cached
+    result for that content or scans it and caches the result.
+    '''
+    start_time = time.time()
+    timing = {}
+    try:
+        if content_hash is None:
+            content_hash = file_hash(path)
+            timing['hash_seconds'] = time.time() - start_time
+
+        result = None if rescan else load_cached(cache_dir, content_hash, key)
+        cached = result is not None
+        if not cached:
+            scan_start = time.time()
+            result = WPSHeadlessScanner(window=window).scan(path)
+            timing['scan_seconds'] = time.time() - scan_start
+            result.pop('path', None)
+            save_json(cache_path(cache_dir, content_hash, key), result)
+    except (OSError, ValueError, struct.error) as e:
+        return {'path': path, 'error': str(e), 'seconds': time.time() - start_time}
+
+    result = dict(result, path=path, sha256=content_hash, cached=cached, **timing)
+    result['seconds'] = time.time() - start_time
+    return result
+
+
+def load_memo(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, STAT_MEMO), 'r') as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return {}
+
+
+def run_batch(paths, output, window=DEFAULT_WINDOW, jobs=None, cache_dir=DEFAULT_CACHE_DIR, min_size=4, rescan=False):
+    '''
+    Scans every image under paths and writes one JSON line per image to output.
+
+    Returns a summary dictionary.
+    '''
+    key = cache_key(window)
+    memo = load_memo(cache_dir)
+    new_memo = {}
+    summary = {'images': 0, 'cached': 0, 'scanned': 0, 'errors': 0, 'candidates': 0}
+    start_time = time.time()
+
+    def emit(result):
+        summary['images'] += 1
+        if 'error' in result:
+            summary['errors'] += 1
+        else:
+            summary['cached' if result['cached'] else 'scanned'] += 1
+            summary['candidates'] += 1 if result['regions'] else 0
+            new_memo[result['path']] = [result['size'], stat_keys[result['path']], result['sha256']]
+        output.write(json.dumps(result) + '\n')
+        output.flush()
+
+    stat_keys = {}
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = []
+        for path, st in find_images(paths, min_size):
+            stat_keys[path] = st.st_mtime_ns
+            known = memo.get(path)
+            content_hash = known[2] if known and known[:2] == [st.st_size, st.st_mtime_ns] else None
+
+            # Unchanged file with a cached result: no need to go through the pool
+            if content_hash and not rescan:
+                result = load_cached(cache_dir, content_hash, key)
+                if result is not None:
+                    emit(dict(result, path=path, sha256=content_hash, cached=True, seconds=0.0))
+                    continue
+
+            futures.append(executor.submit(scan_image, path, window, cache_dir, key, content_hash, rescan))
+        for future in as_completed(futures):
+            emit(future.result())
+
+    save_json(os.path.join(cache_dir, STAT_MEMO), dict(memo, **new_memo))
+    summary['seconds'] = time.time() - start_time
+    return summary
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or '-h' in args or '--help' in args:
+        print("Usage: %s [options] PATH [PATH ...]" % os.path.basename(sys.argv[0]))
+        print("")
+        print("  --output FILE     JSONL output (default: stdout)")
+        print("  --jobs N          Worker processes (default: CPU count)")
+        print("  --window N        Co-occurrence window in bytes (default 0x%X)" % DEFAULT_WINDOW)
+        print("  --cache-dir DIR   Result cache (default %s)" % DEFAULT_CACHE_DIR)
+        print("  --min-size N      Skip files smaller than N bytes (default 4)")
+        print("  --rescan          Ignore cached results")
+        sys.exit(0)
+
+    def option(name, default=None):
+        if name in args:
+            index = args.index(name)
+            value = args[index + 1]
+            del args[index:index + 2]
+            return value
+        return default
+
+    output = option('--output')
+    jobs = option('--jobs')
+    window = int(option('--window', str(DEFAULT_WINDOW)), 0)
+    cache_dir = option('--cache-dir', DEFAULT_CACHE_DIR)
+    min_size = int(option('--min-size', '4'), 0)
+    rescan = '--rescan' in args
+    paths = [a for a in args if not a.startswith('--')]
+
+    fp = open(output, 'w') if output else sys.stdout
+    try:
+        summary = run_batch(paths, fp, window, int(jobs) if jobs else None, cache_dir, min_size, rescan)
+    finally:
+        if output:
+            fp.close()
+
+    sys.stderr.write("%d images: %d scanned, %d cached, %d errors, %d with candidate regions (%.1fs)\n" % (
+        summary['images'], summary['scanned'], summary['cached'], summary['errors'],
+        summary['candidates'], summary['seconds']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+'''
+Headless counterpart of wpsearch.py for triaging firmware images without IDA.
+
+Memory-maps an ELF or raw binary and scans its executable sections for the
+constants of a wpsearch.py signature (the WPS PIN checksum by default), either
+as literal 32-bit words or as MIPS lui/ori and lui/addiu split-immediate pairs.
+Regions where enough of the constants to meet the signature's threshold occur
+within a window of each other are reported as candidates.
+
+Images are scanned in fixed-size chunks, so memory use does not depend on the
+size of the image. NumPy is used when available, with a regex based fallback.
+'''
+import os
+import re
+import sys
+import mmap
+import json
+import time
+import struct
+
+try:
+    import numpy
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from wpsearch import SIGNATURES, WPS_PIN_CHECKSUM
+
+ELF_MAGIC = b'\x7fELF'
+EM_MIPS = 8
+SHT_NOBITS = 8
+SHF_EXECINSTR = 0x4
+PT_LOAD = 1
+PF_X = 0x1
+
+MIPS_LUI = 0x0F
+MIPS_ADDIU = 0x09
+MIPS_ORI = 0x0D
+
+CHUNK_SIZE = 16 * 1024 * 1024
+PAIR_WINDOW = 8
+DEFAULT_WINDOW = 0x800
+
+
+class Region(object):
+    '''
+    A contiguous range of an image to scan (an executable section or segment).
+    '''
+
+    def __init__(self, name, offset, size, address):
+        self.name = name
+        self.offset = offset
+        self.size = size
+        self.address = address
+
+    def to_dict(self):
+        return {'name': self.name, 'offset': self.offset, 'size': self.size, 'address': self.address}
+
+
+class Cooccurrence(object):
+    '''
+    Streams hits in address order and records the ranges where at least
+    `required` distinct constants were seen within `window` bytes. Only the
+    last address of each constant is kept, so memory does not grow with the
+    number of hits.
+    '''
+
+    def __init__(self, constants, window, required=None):
+        self.window = window
+        self.required = required or len(constants)
+        self.last = dict((constant, None) for constant in constants)
+        self.regions = []
+
+    def add(self, address, offset, constant):
+        self.last[constant] = (address, offset)
+
+        near = [hit for hit in self.last.values() if hit is not None and address - hit[0] <= self.window]
+        if len(near) < self.required:
+            return
+
+        start = min(near)
+        if self.regions and start[0] <= self.regions[-1]['end']:
+            self.regions[-1]['end'] = address
+        else:
+            self.regions.append({'start': start[0], 'end': address, 'offset': start[1]})
+
+
+class WPSHeadlessScanner(object):
+    '''
+    Scans an image file for the constants of a wpsearch.Signature.
+    '''
+
+    def __init__(self, signature=None, window=DEFAULT_WINDOW, chunk_size=CHUNK_SIZE):
+        self.signature = signature or WPS_PIN_CHECKSUM
+        self.constants = list(self.signature.constants)
+        self.constant_set = set(self.constants)
+        self.window = window
+        self.chunk_size = chunk_size - (chunk_size % 4)
+
+        # The upper half of each constant as loaded by lui, for both of the
+        # lower half instructions (addiu sign extends its immediate)
+        self.upper = set()
+        for constant in self.constants:
+            self.upper.add(constant >> 16)
+            self.upper.add(((constant + 0x8000) >> 16) & 0xFFFF)
+
+        if HAS_NUMPY:
+            # 64K entry lookup tables on each half of a word are much cheaper
+            # than numpy.isin() over every chunk
+            self.literal_high = numpy.zeros(0x10000, dtype=bool)
+            self.literal_low = numpy.zeros(0x10000, dtype=bool)
+            self.upper_table = numpy.zeros(0x10000, dtype=bool)
+            self.literal_high[[c >> 16 for c in self.constants]] = True
+            self.literal_low[[c & 0xFFFF for c in self.constants]] = True
+            self.upper_table[sorted(self.upper)] = True
+
+    def scan(self, path):
+        '''
+        Scans the file at path.
+
+        Returns a dictionary describing the image, the number of hits per
+        constant and the candidate regions.
+        '''
+        result = {
+            'path': path,
+            'signature': self.signature.name,
+            'size': os.path.getsize(path),
+            'format': 'raw',
+            'mips': True,
+            'sections': [],
+            'scans': [],
+            'regions': [],
+            'seconds': 0.0,
+            'backend': 'numpy' if HAS_NUMPY else 're',
+        }
+        if not result['size']:
+            return result
+
+        start_time = time.time()
+        with open(path, 'rb') as fp:
+            mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                if mm[:4] == ELF_MAGIC:
+                    endian, mips, regions = self._elf_regions(mm)
+                    result.update(format='elf', mips=mips, sections=[r.to_dict() for r in regions])
+                    endians = [endian]
+                else:
+                    regions = [Region('raw', 0, len(mm), 0)]
+                    endians = ['>', '<']
+
+                for endian in endians:
+                    result['scans'].append(self._scan_regions(mm, regions, endian, result['mips']))
+            finally:
+                mm.close()
+
+        result['regions'] = [dict(region, endian=scan['endian'])
+                             for scan in result['scans'] for region in scan['regions']]
+        result['seconds'] = time.time() - start_time
+        return result
+
+    def _elf_regions(self, mm):
+        '''
+        Returns the byte order, whether the ELF is MIPS, and its executable
+        sections (or executable PT_LOAD segments if it has no section headers).
+        '''
+        is64 = mm[4] == 2
+        endian = '>' if mm[5] == 2 else '<'
+        header = struct.unpack_from(endian + ('HHIQQQIHHHHHH' if is64 else 'HHIIIIIHHHHHH'), mm, 16)
+        (e_type, e_machine, e_version, e_entry, e_phoff, e_shoff, e_flags,
+         e_ehsize, e_phentsize, e_phnum, e_shentsize, e_shnum, e_shstrndx) = header
+        size = len(mm)
+
+        regions = []
+        if e_shoff and e_shnum and e_shoff + e_shnum * e_shentsize <= size:
+            fmt = endian + ('IIQQQQ' if is64 else 'IIIIII')
+            for i in range(e_shnum):
+                sh_name, sh_type, sh_flags, sh_addr, sh_offset, sh_size = \
+                    struct.unpack_from(fmt, mm, e_shoff + i * e_shentsize)
+                if sh_flags & SHF_EXECINSTR and sh_type != SHT_NOBITS and sh_offset < size:
+                    regions.append(Region('section[%d]' % i, sh_offset, min(sh_size, size - sh_offset), sh_addr))
+
+        if not regions and e_phoff and e_phnum and e_phoff + e_phnum * e_phentsize <= size:
+            for i in range(e_phnum):
+                if is64:
+                    p_type, p_flags, p_offset, p_vaddr, p_paddr, p_filesz, p_memsz = \
+                        struct.unpack_from(endian + 'IIQQQQQ', mm, e_phoff + i * e_phentsize)
+                else:
+                    p_type, p_offset, p_vaddr, p_paddr, p_filesz, p_memsz, p_flags = \
+                        struct.unpack_from(endian + 'IIIIIII', mm, e_phoff + i * e_phentsize)
+                if p_type == PT_LOAD and p_flags & PF_X and p_offset < size:
+                    regions.append(Region('segment[%d]' % i, p_offset, min(p_filesz, size - p_offset), p_vaddr))
+
+        if not regions:
+            regions = [Region('raw', 0, size, 0)]
+
+        regions.sort(key=lambda r: r.address)
+        return endian, e_machine == EM_MIPS, regions
+
+    def _scan_regions(self, mm, regions, endian, mips):
+        tracker = Cooccurrence(self.constants, self.window, self.signature.required)
+        counts = dict((constant, 0) for constant in self.constants)
+        pairs = 0
+
+        for region in regions:
+            # Keep words aligned to the region's load address
+            start = region.offset + (-region.address % 4)
+            end = region.offset + region.size
+            end -= (end - start) % 4
+
+            for chunk_start in range(start, end, self.chunk_size):
+                chunk_end = min(chunk_start + self.chunk_size, end)
+                hits = []
+                for offset, word in self._candidates(mm, chunk_start, chunk_end, endian, mips):
+                    if word in counts:
+                        hits.append((offset, word))
+                    elif mips and (word & 0xFFE00000) == (MIPS_LUI << 26):
+                        constant = self._mips_pair(mm, offset, word, end, endian)
+                        if constant is not None:
+                            hits.append((offset, constant))
+                            pairs += 1
+
+                hits.sort()
+                for offset, constant in hits:
+                    counts[constant] += 1
+                    tracker.add(region.address + offset - region.offset, offset, constant)
+
+                # Drop the scanned pages so resident memory stays at one chunk
+                if hasattr(mm, 'madvise'):
+                    page = chunk_start - chunk_start % mmap.PAGESIZE
+                    mm.madvise(mmap.MADV_DONTNEED, page, chunk_end - page)
+
+        return {
+            'endian': 'big' if endian == '>' else 'little',
+            'counts': dict(('0x%08X' % c, n) for c, n in counts.items()),
+            'pairs': pairs,
+            'regions': tracker.regions,
+        }
+
+    def _candidates(self, mm, start, end, endian, mips):
+        '''
+        Yields (offset, word) for the aligned words in [start, end) that may
+        be one of the constants or a lui of one of their upper halves.
+        '''
+        if HAS_NUMPY:
+            words = numpy.frombuffer(mm, dtype=numpy.dtype(endian + 'u4'), count=(end - start) // 4, offset=start)
+            try:
+                low = words & 0xFFFF
+                mask = self.literal_low[low] & self.literal_high[words >> 16]
+                if mips:
+                    mask |= ((words & 0xFFE00000) == (MIPS_LUI << 26)) & self.upper_table[low]
+                indexes = numpy.flatnonzero(mask)
+                values = words[indexes].tolist()
+            finally:
+                del words
+            for index, word in zip(indexes.tolist(), values):
+                yield start + index * 4, word
+        else:
+            pattern = self._candidate_pattern(endian, mips)
+            match = pattern.search(mm, start, end)
+            while match:
+                offset = match.start()
+                if (offset - start) % 4 == 0:
+                    yield offset, struct.unpack_from(endian + 'I', mm, offset)[0]
+                # Step one byte at a time so overlapping candidates are not skipped
+                match = pattern.search(mm, offset + 1, end)
+
+    def _candidate_pattern(self, endian, mips):
+        '''
+        Fallback for when NumPy is not installed: a single regex matching the
+        candidate words at any offset.
+        '''
+        key = (endian, mips)
+        cache = self.__dict__.setdefault('_patterns', {})
+        if key not in cache:
+            alternatives = [re.escape(struct.pack(endian + 'I', c)) for c in self.constants]
+            if mips:
+                for upper in sorted(self.upper):
+                    half = re.escape(struct.pack(endian + 'H', upper))
+                    if endian == '>':
+                        alternatives.append(b'\x3c[\x00-\x1f]' + half)
+                    else:
+                        alternatives.append(half + b'[\x00-\x1f]\x3c')
+            cache[key] = re.compile(b'|'.join(alternatives), re.DOTALL)
+        return cache[key]
+
+    def _mips_pair(self, mm, offset, lui, end, endian):
+        '''
+        Looks for the ori/addiu completing the lui at offset within the next
+        PAIR_WINDOW instructions, and returns the constant it builds (or None).
+        '''
+        register = (lui >> 16) & 0x1F
+        upper = lui & 0xFFFF
+
+        limit = min(offset + 4 + PAIR_WINDOW * 4, end)
+        for insn in struct.unpack_from('%s%dI' % (endian, (limit - offset - 4) // 4), mm, offset + 4):
+            opcode = insn >> 26
+            if (insn >> 21) & 0x1F != register:
+                continue
+
+            lower = insn & 0xFFFF
+            if opcode == MIPS_ORI:
+                value = (upper << 16) | lower
+            elif opcode == MIPS_ADDIU:
+                value = ((upper << 16) + lower - (0x10000 if lower & 0x8000 else 0)) & 0xFFFFFFFF
+            else:
+                continue
+
+            if value in self.constant_set:
+                return value
+        return None
+
+
+def scan_file(path, window=DEFAULT_WINDOW, signature=None):
+    '''
+    Scans a single image (for the WPS PIN checksum signature by default).
+    '''
+    return WPSHeadlessScanner(signature, window).scan(path)
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or '-h' in args or '--help' in args:
+        print("Usage: %s [--window N] [--signature NAME] [--json] IMAGE [IMAGE ...]" % os.path.basename(sys.argv[0]))
+        print("")
+        print("  --signature NAME   One of: %s (default: %s)" % (', '.join(s.name for s in SIGNATURES), WPS_PIN_CHECKSUM.name))
+        print("  --window N         Maximum distance in bytes between co-occurring constants (default 0x%X)" % DEFAULT_WINDOW)
+        print("  --json             Print one JSON result per image")
+        sys.exit(0)
+
+    window = DEFAULT_WINDOW
+    if '--window' in args:
+        index = args.index('--window')
+        window = int(args[index + 1], 0)
+        del args[index:index + 2]
+    signature = None
+    if '--signature' in args:
+        index = args.index('--signature')
+        names = dict((s.name.lower(), s) for s in SIGNATURES)
+        signature = names.get(args[index + 1].lower())
+        if signature is None:
+            sys.exit("Unknown signature: %s" % args[index + 1])
+        del args[index:index + 2]
+    as_json = '--json' in args
+    paths = [a for a in args if not a.startswith('--')]
+
+    scanner = WPSHeadlessScanner(signature, window)
+    errors = 0
+    for path in paths:
+        start_time = time.time()
+        try:
+            result = scanner.scan(path)
+        except (OSError, ValueError, struct.error) as e:
+            # One unreadable or truncated image should not abort the rest
+            errors += 1
+            if as_json:
+                print(json.dumps({'path': path, 'error': str(e), 'seconds': time.time() - start_time}))
+            else:
+                sys.stderr.write("%s: error: %s\n" % (path, e))
+            continue
+
+        if as_json:
+            print(json.dumps(result))
+            continue
+
+        print("%s (%s, %d bytes, %.2fs)" % (path, result['format'], result['size'], result['seconds']))
+        for scan in result['scans']:
+            found = sum(1 for n in scan['counts'].values() if n)
+            print("  %s endian: %d/%d constants, %d lui pairs" % (scan['endian'], found, len(scan['counts']), scan['pairs']))
+            for region in scan['regions']:
+                print("    candidate 0x%08X - 0x%08X (file offset 0x%X)" % (region['start'], region['end'], region['offset']))
+
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
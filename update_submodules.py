@@ -8,14 +8,17 @@ import os
 import sys
 import time
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Union
 
-def run_command(cmd: str, cwd: str = None, timeout: int = 300) -> Dict:
-    """執行命令並返回結果"""
+def run_command(cmd: Union[str, List[str]], cwd: str = None, timeout: int = 300) -> Dict:
+    """執行命令並返回結果 (cmd 可為字串或參數列表，路徑含空白時請用列表)"""
+    args = cmd.split() if isinstance(cmd, str) else cmd
+    cmd = cmd if isinstance(cmd, str) else ' '.join(cmd)
     try:
         result = subprocess.run(
-            cmd.split(),
+            args,
             cwd=cwd,
             capture_output=True,
             text=True,
@@ -132,20 +135,21 @@ def get_submodule_status() -> List[Dict]:
     
 #     return submodule
 
-def update_submodule(submodule: Dict, force: bool = False) -> Dict:
-    """更新單個 submodule"""
+def update_submodule(submodule: Dict, force: bool = False, quiet: bool = False) -> Dict:
+    """更新單個 submodule (quiet=True 時不輸出進度，供並行更新使用)"""
     path = submodule['path']
-    print(f"🔄 更新 {path}...", end=' ')
+    log = (lambda *args, **kwargs: None) if quiet else print
+    log(f"🔄 更新 {path}...", end=' ')
     
     start_time = time.time()
     
     # 如果未初始化，先初始化
     if submodule['uninitialized']:
-        print("(初始化)", end=' ')
+        log("(初始化)", end=' ')
         init_result = run_command(f"git submodule update --init {path}")
         if not init_result['success']:
             duration = time.time() - start_time
-            print(f"❌ 初始化失敗 ({duration:.1f}s)")
+            log(f"❌ 初始化失敗 ({duration:.1f}s)")
             return {
                 'path': path,
                 'success': False,
@@ -165,7 +169,7 @@ def update_submodule(submodule: Dict, force: bool = False) -> Dict:
     duration = time.time() - start_time
     
     if update_result['success']:
-        print(f"✅ 成功 ({duration:.1f}s)")
+        log(f"✅ 成功 ({duration:.1f}s)")
         return {
             'path': path,
             'success': True,
@@ -174,7 +178,7 @@ def update_submodule(submodule: Dict, force: bool = False) -> Dict:
             'output': update_result['stdout']
         }
     else:
-        print(f"❌ 失敗 ({duration:.1f}s)")
+        log(f"❌ 失敗 ({duration:.1f}s)")
         return {
             'path': path,
             'success': False,
@@ -183,6 +187,221 @@ def update_submodule(submodule: Dict, force: bool = False) -> Dict:
             'duration': duration
         }
 
+def get_gitlinks(paths: List[str]) -> Dict[str, str]:
+    """一次讀取 HEAD 中所有 submodule 的 gitlink commit"""
+    gitlinks = {}
+    if not paths:
+        return gitlinks
+
+    result = run_command(['git', 'ls-tree', 'HEAD', '--'] + paths)
+    if not result['success']:
+        return gitlinks
+
+    # 格式: <mode> <type> <sha>\t<path>
+    for line in result['stdout'].split('\n'):
+        if '\t' not in line:
+            continue
+        meta, path = line.split('\t', 1)
+        parts = meta.split()
+        if len(parts) == 3 and parts[1] == 'commit':
+            gitlinks[path] = parts[2]
+
+    return gitlinks
+
+def get_submodule_branches() -> Dict[str, str]:
+    """從 .gitmodules 讀取各 submodule 追蹤的分支 (path -> branch)"""
+    result = run_command("git config -f .gitmodules --list")
+    if not result['success']:
+        return {}
+
+    sections = {}
+    for line in result['stdout'].split('\n'):
+        if not line.startswith('submodule.') or '=' not in line:
+            continue
+        key, value = line.split('=', 1)
+        name, attr = key[len('submodule.'):].rsplit('.', 1)
+        sections.setdefault(name, {})[attr] = value.strip()
+
+    return {s['path']: s['branch'] for s in sections.values() if 'path' in s and 'branch' in s}
+
+def plan_submodule(submodule: Dict, gitlink: str, branch: str = None) -> Dict:
+    """只抓取 refs (不 checkout)，計算 gitlink 與遠端目標之間的差異"""
+    path = submodule['path']
+    start_time = time.time()
+    plan = {
+        'path': path,
+        'url': submodule['url'],
+        'gitlink': gitlink,
+        'target': '',
+        'ahead': None,
+        'behind': None,
+        'changed_files': None,
+        'status': 'error',
+        'error': ''
+    }
+
+    def finish(status: str, error: str = '') -> Dict:
+        plan['status'] = status
+        plan['error'] = error
+        plan['duration'] = time.time() - start_time
+        return plan
+
+    if not gitlink:
+        return finish('error', '找不到 gitlink')
+
+    # 未初始化的 submodule 沒有本地倉庫，只能用 ls-remote 取得目標 commit
+    if not os.path.exists(os.path.join(path, '.git')):
+        ref = f"refs/heads/{branch}" if branch else 'HEAD'
+        remote_result = run_command(['git', 'ls-remote', submodule['url'], ref], timeout=60)
+        if not remote_result['success'] or not remote_result['stdout']:
+            return finish('error', remote_result['stderr'] or f'遠端沒有 {ref}')
+        plan['target'] = remote_result['stdout'].split()[0]
+        if plan['target'] == gitlink:
+            plan.update({'ahead': 0, 'behind': 0, 'changed_files': 0})
+            return finish('up_to_date')
+        return finish('uninitialized')
+
+    fetch_result = run_command(['git', '-C', path, 'fetch', '--quiet', '--no-tags', 'origin'])
+    if not fetch_result['success']:
+        return finish('error', fetch_result['stderr'])
+
+    # 與 `git submodule update --remote` 相同: 有設定 branch 用 origin/<branch>，否則用 origin/HEAD
+    target_result = None
+    for ref in ([f"origin/{branch}"] if branch else []) + ['origin/HEAD', 'FETCH_HEAD']:
+        target_result = run_command(['git', '-C', path, 'rev-parse', '--verify', '--quiet', f"{ref}^{{commit}}"])
+        if target_result['success']:
+            break
+    if not target_result['success']:
+        return finish('error', '無法解析遠端目標分支')
+    plan['target'] = target_result['stdout']
+
+    counts_result = run_command(['git', '-C', path, 'rev-list', '--left-right', '--count',
+                                 f"{plan['target']}...{gitlink}"])
+    if not counts_result['success']:
+        return finish('error', counts_result['stderr'])
+    behind, ahead = (int(n) for n in counts_result['stdout'].split())
+
+    diff_result = run_command(['git', '-C', path, 'diff', '--name-only', gitlink, plan['target']])
+    if not diff_result['success']:
+        return finish('error', diff_result['stderr'])
+
+    plan.update({
+        'ahead': ahead,
+        'behind': behind,
+        'changed_files': len([f for f in diff_result['stdout'].split('\n') if f])
+    })
+
+    if ahead and behind:
+        return finish('diverged')
+    if behind:
+        return finish('behind')
+    if ahead:
+        return finish('ahead')
+    return finish('up_to_date')
+
+def plan_submodules(submodules: List[Dict], jobs: int = 8) -> List[Dict]:
+    """並行抓取所有 submodule 的 refs，返回每個 submodule 的更新計畫"""
+    paths = [s['path'] for s in submodules]
+    gitlinks = get_gitlinks(paths)
+    branches = get_submodule_branches()
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        futures = [
+            executor.submit(plan_submodule, s, gitlinks.get(s['path'], ''), branches.get(s['path']))
+            for s in submodules
+        ]
+        return [f.result() for f in futures]
+
+def print_plan_table(plans: List[Dict]) -> None:
+    """以表格顯示更新計畫"""
+    def fmt(value) -> str:
+        return '?' if value is None else str(value)
+
+    width = max([len(p['path']) for p in plans] + [len('Submodule')])
+    print(f"{'Submodule':<{width}}  {'Gitlink':<8}  {'Target':<8}  {'Behind':>6}  {'Ahead':>5}  {'Files':>5}  狀態")
+    print('-' * (width + 54))
+    for p in sorted(plans, key=lambda p: p['path']):
+        print(f"{p['path']:<{width}}  {p['gitlink'][:8]:<8}  {p['target'][:8]:<8}  "
+              f"{fmt(p['behind']):>6}  {fmt(p['ahead']):>5}  {fmt(p['changed_files']):>5}  {p['status']}"
+              + (f" ({p['error']})" if p['error'] else ''))
+
+def save_plan(plans: List[Dict], filename: str = 'submodule_plan.json') -> Dict:
+    """保存更新計畫"""
+    plan_data = {
+        'timestamp': datetime.now().isoformat(),
+        'total_count': len(plans),
+        'pending_count': sum(1 for p in plans if p['status'] in ('behind', 'diverged', 'uninitialized')),
+        'total_commits_behind': sum(p['behind'] or 0 for p in plans),
+        'total_changed_files': sum(p['changed_files'] or 0 for p in plans),
+        'submodules': plans
+    }
+
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(plan_data, f, ensure_ascii=False, indent=2)
+
+    return plan_data
+
+def init_submodules(paths: List[str]) -> Dict:
+    """一次初始化多個 submodule (寫入 .git/config)，避免並行更新時搶 config 鎖"""
+    return run_command(['git', 'submodule', 'init', '--'] + paths)
+
+def update_all_submodules(submodules: List[Dict], force: bool = False, skip_failed: bool = False,
+                          retry_count: int = 1, jobs: int = 1, delay: float = 0.5) -> List[Dict]:
+    """更新所有 submodule 並重試失敗的模組; jobs > 1 時並行更新"""
+    all_results = []
+    failed_modules = []
+
+    for attempt in range(retry_count):
+        if attempt > 0:
+            print(f"\n🔁 第 {attempt + 1} 次重試 (處理 {len(failed_modules)} 個失敗的模組)")
+            submodules_to_process = [s for s in submodules if s['path'] in failed_modules]
+        else:
+            print("🚀 開始更新所有 submodule...")
+            submodules_to_process = submodules
+
+        current_results = []
+        total = len(submodules_to_process)
+
+        if jobs > 1:
+            # 先一次完成初始化，之後每個 update 只會寫入自己的 .git/modules/<name>
+            # (成功後 worker 不再各自執行 git submodule update --init)
+            uninitialized = [s['path'] for s in submodules_to_process if s['uninitialized']]
+            if uninitialized and init_submodules(uninitialized)['success']:
+                submodules_to_process = [dict(s, uninitialized=False) for s in submodules_to_process]
+
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                futures = [executor.submit(update_submodule, s, force, True) for s in submodules_to_process]
+                for i, future in enumerate(futures):
+                    result = future.result()
+                    mark = '✅' if result['success'] else '❌'
+                    print(f"[{i+1}/{total}] {mark} {result['path']} ({result['duration']:.1f}s)")
+                    current_results.append(result)
+        else:
+            for i, submodule in enumerate(submodules_to_process):
+                print(f"[{i+1}/{total}] ", end='')
+
+                result = update_submodule(submodule, force)
+                current_results.append(result)
+
+                # 短暫延遲避免過載
+                if delay and i < total - 1:
+                    time.sleep(delay)
+
+        # 更新失敗列表
+        if attempt == 0:
+            all_results = current_results
+        else:
+            # 更新之前的結果
+            new_results = {r['path']: r for r in current_results}
+            all_results = [new_results.get(r['path'], r) for r in all_results]
+
+        failed_modules = [r['path'] for r in all_results if not r['success']]
+
+        if not failed_modules or skip_failed:
+            break
+
+    return all_results
+
 def save_update_log(results: List[Dict], filename: str = 'submodule_update_log.json'):
     """保存更新日誌"""
     log_data = {
@@ -258,7 +477,9 @@ def main():
     force_update = '--force' in sys.argv
     skip_failed = '--skip-failed' in sys.argv
     clean_orphaned = '--clean' in sys.argv  # 新增清理選項
+    plan_only = '--plan' in sys.argv
     retry_count = 1
+    jobs = None
     
     if '--retry' in sys.argv:
         try:
@@ -266,16 +487,45 @@ def main():
             retry_count = int(sys.argv[retry_index + 1])
         except (IndexError, ValueError):
             retry_count = 2
+
+    if '--jobs' in sys.argv:
+        try:
+            jobs_index = sys.argv.index('--jobs')
+            jobs = max(1, int(sys.argv[jobs_index + 1]))
+        except (IndexError, ValueError):
+            pass
     
     print("🔄 批量更新 Git Submodules")
     print("=" * 60)
-    print(f"選項: 強制更新={force_update}, 跳過失敗={skip_failed}, 清理孤立目錄={clean_orphaned}, 重試次數={retry_count}")
+    print(f"選項: 強制更新={force_update}, 跳過失敗={skip_failed}, 清理孤立目錄={clean_orphaned}, 重試次數={retry_count}, 並行數={jobs or 1}")
     print()
     
     # 確認在 git 倉庫中
     if not os.path.exists('.git'):
         print("❌ 當前目錄不是 Git 倉庫")
         return
+
+    # 只產生更新計畫，不修改任何工作目錄
+    if plan_only:
+        submodules = parse_gitmodules()
+        if not submodules:
+            print("📭 沒有找到任何 submodule")
+            return
+
+        print(f"🔎 抓取 {len(submodules)} 個 submodule 的 refs (並行數 {jobs or 8})...")
+        start_time = time.time()
+        plans = plan_submodules(submodules, jobs or 8)
+        print()
+        print_plan_table(plans)
+
+        plan_data = save_plan(plans)
+        print()
+        print(f"📦 待更新: {plan_data['pending_count']} / {plan_data['total_count']}")
+        print(f"📈 落後 commit 總數: {plan_data['total_commits_behind']}")
+        print(f"📝 變更檔案總數: {plan_data['total_changed_files']}")
+        print(f"⏱️  總耗時: {time.time() - start_time:.1f} 秒")
+        print(f"📄 計畫已保存到: submodule_plan.json")
+        return
     
     # 如果指定了清理選項，先執行清理
     if clean_orphaned:
@@ -307,45 +557,9 @@ def main():
     print(f"  • 衝突: {status_counts['merge_conflict']}")
     print()
     
-    # 開始更新
-    all_results = []
-    failed_modules = []
-    
-    for attempt in range(retry_count):
-        if attempt > 0:
-            print(f"\n🔁 第 {attempt + 1} 次重試 (處理 {len(failed_modules)} 個失敗的模組)")
-            submodules_to_process = [s for s in submodules if s['path'] in failed_modules]
-        else:
-            print("🚀 開始更新所有 submodule...")
-            submodules_to_process = submodules
-    
-        current_results = []
-        
-        for i, submodule in enumerate(submodules_to_process):
-            print(f"[{i+1}/{len(submodules_to_process)}] ", end='')
-            
-            result = update_submodule(submodule, force_update)
-            current_results.append(result)
-            
-            # 短暫延遲避免過載
-            if i < len(submodules_to_process) - 1:
-                time.sleep(0.5)
-        
-        # 更新失敗列表
-        if attempt == 0:
-            all_results = current_results
-        else:
-            # 更新之前的結果
-            for new_result in current_results:
-                for j, old_result in enumerate(all_results):
-                    if old_result['path'] == new_result['path']:
-                        all_results[j] = new_result
-                        break
-        
-        failed_modules = [r['path'] for r in all_results if not r['success']]
-        
-        if not failed_modules or skip_failed:
-            break
+    # 開始更新 (未指定 --jobs 時維持逐一更新)
+    update_jobs = jobs or 1
+    all_results = update_all_submodules(submodules, force_update, skip_failed, retry_count, update_jobs)
     
     print()
     print("=" * 60)
@@ -429,6 +643,8 @@ if __name__ == "__main__":
         print("  --skip-failed  跳過失敗的模組，不進行重試")
         print("  --retry N      失敗模組重試 N 次 (預設 1 次)")
         print("  --clean        清理不在 .gitmodules 中的孤立目錄")
+        print("  --plan         只抓取 refs 並列出每個 submodule 的 ahead/behind 與變更檔案數 (不更新)")
+        print("  --jobs N       並行數 (--plan 預設 8，更新預設 1 即逐一更新)")
         print("  -h, --help     顯示此說明")
         print("")
         print("範例:")
@@ -436,6 +652,7 @@ if __name__ == "__main__":
         print("  python3 update_submodules.py --force")
         print("  python3 update_submodules.py --clean")
         print("  python3 update_submodules.py --retry 3 --clean")
+        print("  python3 update_submodules.py --plan --jobs 16")
         sys.exit(0)
     
     main()